@@ -1,5 +1,6 @@
 import os
 import re
+import time
 from html import escape
 from datetime import datetime
 
@@ -20,6 +21,8 @@ from core import (
     provider_help_url,
     safe_filename,
     save_api_key,
+    string_list,
+    stringify_report,
 )
 
 
@@ -295,6 +298,39 @@ def collect_display_links(result: ResearchResponse) -> list[str]:
     return links
 
 
+def make_token_renderer(slot, interval: float = 0.15):
+    tokens = []
+    last_render = 0.0
+
+    def render(token: str) -> None:
+        nonlocal last_render
+        tokens.append(token)
+        now = time.monotonic()
+        if now - last_render >= interval:
+            slot.code("".join(tokens), language="json", wrap_lines=True)
+            last_render = now
+
+    return render
+
+
+def make_field_renderer(slot):
+    fields = {}
+
+    def render(name: str, value: object) -> None:
+        if name not in {"topic", "summary", "key_findings"}:
+            return
+        fields[name] = value
+        with slot.container():
+            if "topic" in fields:
+                st.markdown(f"### {stringify_report(fields['topic'])}")
+            if "summary" in fields:
+                st.write(stringify_report(fields["summary"]))
+            for finding in string_list(fields.get("key_findings")):
+                st.markdown(f"- {finding}")
+
+    return render
+
+
 def render_hero(provider: str, model_name: str | None = None) -> None:
     model_html = (
         f'<span class="context-pill">Model: {escape(model_name)}</span>'
@@ -547,6 +583,16 @@ def main() -> None:
                 placeholder="Example: Research quantum computing applications in healthcare, finance, and logistics. Include links and detailed analysis.",
                 height=140,
             )
+            refresh = st.checkbox(
+                "Ignore cached results",
+                value=False,
+                help="Identical questions are answered from the local result cache. Tick this to run fresh research.",
+            )
+            reuse_similar = st.checkbox(
+                "Reuse answers to near-identical questions",
+                value=False,
+                help="Serve a cached report when an earlier question with the same model is a close paraphrase.",
+            )
             col_a, col_b = st.columns([1, 3])
             with col_a:
                 submitted = st.form_submit_button("Start Research", type="primary", use_container_width=True)
@@ -575,9 +621,20 @@ def main() -> None:
 """,
                 unsafe_allow_html=True,
             )
+            fields_slot = st.empty()
+            stream_slot = st.empty()
             with st.spinner(""):
                 try:
-                    result = perform_research(provider, api_key, model_name, query.strip())
+                    result = perform_research(
+                        provider,
+                        api_key,
+                        model_name,
+                        query.strip(),
+                        on_token=make_token_renderer(stream_slot),
+                        on_field=make_field_renderer(fields_slot),
+                        refresh=refresh,
+                        reuse_similar=reuse_similar,
+                    )
                     st.session_state.research_results = result
                     st.session_state.research_error = None
                     st.session_state.history.insert(
@@ -595,6 +652,8 @@ def main() -> None:
                     st.session_state.research_error = str(exc)
                 finally:
                     status_slot.empty()
+                    fields_slot.empty()
+                    stream_slot.empty()
 
     if st.session_state.research_error:
         st.error(st.session_state.research_error)
@@ -0,0 +1,184 @@
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from cache import normalize_query
+from core import aperform_research
+
+
+@dataclass(frozen=True)
+class BatchItem:
+    item_id: str
+    query: str
+
+
+def default_item_id(query: str) -> str:
+    return hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()[:12]
+
+
+def default_output_path(source: str) -> Path:
+    output_dir = Path(__file__).resolve().parent / "research_outputs"
+    stem = "stdin" if source == "-" else Path(source).stem
+    return output_dir / f"{stem}-results.jsonl"
+
+
+def parse_csv(text: str) -> list[BatchItem]:
+    reader = csv.DictReader(io.StringIO(text))
+    names = {name.strip().lower(): name for name in reader.fieldnames or []}
+    query_field = names.get("query") or next(iter(names.values()), "")
+    id_field = names.get("id")
+
+    items = []
+    for row in reader:
+        query = (row.get(query_field) or "").strip()
+        if query:
+            item_id = (row.get(id_field) or "").strip() if id_field else ""
+            items.append(BatchItem(item_id or default_item_id(query), query))
+    return items
+
+
+def parse_jsonl(text: str) -> list[BatchItem]:
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError:
+            value = line
+        if isinstance(value, dict):
+            query = str(value.get("query") or value.get("topic") or "").strip()
+            item_id = str(value.get("id") or "").strip()
+        else:
+            query = str(value).strip()
+            item_id = ""
+        if query:
+            items.append(BatchItem(item_id or default_item_id(query), query))
+    return items
+
+
+def read_items(source: str) -> list[BatchItem]:
+    if source == "-":
+        text = sys.stdin.read()
+        is_csv = text.lstrip().lower().startswith(("query,", "id,", '"query"', '"id"'))
+    else:
+        path = Path(source)
+        text = path.read_text(encoding="utf-8")
+        is_csv = path.suffix.lower() == ".csv"
+
+    items = parse_csv(text) if is_csv else parse_jsonl(text)
+    unique = {}
+    for item in items:
+        unique.setdefault(item.item_id, item)
+    return list(unique.values())
+
+
+def load_completed(output_path: Path) -> set[str]:
+    completed = set()
+    if not output_path.exists():
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok" and record.get("id"):
+                completed.add(record["id"])
+    return completed
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def research_item(
+    item: BatchItem,
+    provider: str,
+    api_key: str,
+    model_name: str,
+    semaphore: asyncio.Semaphore,
+    use_cache: bool = True,
+    refresh: bool = False,
+) -> dict:
+    async with semaphore:
+        started = time.perf_counter()
+        record = {"id": item.item_id, "query": item.query, "provider": provider, "model": model_name}
+        try:
+            result = await aperform_research(
+                provider,
+                api_key,
+                model_name,
+                item.query,
+                use_cache=use_cache,
+                refresh=refresh,
+            )
+            record.update(status="ok", result=result.model_dump())
+        except Exception as exc:
+            record.update(status="error", error=str(exc))
+        record["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        record["completed_at"] = datetime.now().isoformat(timespec="seconds")
+        return record
+
+
+async def run_batch(
+    items: list[BatchItem],
+    provider: str,
+    api_key: str,
+    model_name: str,
+    output_path: Path,
+    concurrency: int = 4,
+    resume: bool = True,
+    on_record=None,
+    use_cache: bool = True,
+    refresh: bool = False,
+) -> dict:
+    completed = load_completed(output_path) if resume else set()
+    pending = [item for item in items if item.item_id not in completed]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    latencies = []
+    succeeded = failed = 0
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as f:
+        tasks = [
+            asyncio.create_task(research_item(item, provider, api_key, model_name, semaphore, use_cache, refresh))
+            for item in pending
+        ]
+        for task in asyncio.as_completed(tasks):
+            record = await task
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            latencies.append(record["elapsed_seconds"])
+            if record["status"] == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+            if on_record:
+                on_record(record)
+
+    wall_seconds = time.perf_counter() - started
+    return {
+        "total": len(items),
+        "skipped": len(items) - len(pending),
+        "succeeded": succeeded,
+        "failed": failed,
+        "wall_seconds": round(wall_seconds, 2),
+        "queries_per_minute": round(len(pending) / wall_seconds * 60, 2) if pending and wall_seconds else 0.0,
+        "latency_p50_seconds": round(percentile(latencies, 0.5), 2),
+        "latency_p95_seconds": round(percentile(latencies, 0.95), 2),
+        "output": str(output_path),
+    }
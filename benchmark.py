@@ -0,0 +1,330 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import Tool
+
+import core
+from batch import percentile
+from tools import search_tool, wiki_tool
+
+
+SCENARIOS = ["happy", "normalize", "direct", "fallback"]
+IMPORT_MODULES = ["core", "main", "review_server", "batch"]
+HEAVY_MODULES = ["langchain_openai", "langgraph", "langchain_community", "openai", "httpx", "duckduckgo_search", "wikipedia"]
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "500"))
+PROVIDER = core.PROVIDER_OPENROUTER
+MODEL = "benchmark/scripted"
+
+REPORT = "\n\n".join(
+    f"Section {index}: quantum error correction, hardware roadmaps, and deployment costs are compared "
+    f"against published results from https://example.org/source-{index} and https://en.wikipedia.org/wiki/Topic_{index}."
+    for index in range(1, 13)
+)
+ANSWER = json.dumps(
+    {
+        "topic": "Benchmark topic",
+        "summary": "A scripted research summary used for offline benchmarking.",
+        "detailed_report": REPORT,
+        "key_findings": [f"Finding {index}" for index in range(1, 7)],
+        "sources": ["Example source", "Wikipedia"],
+        "source_links": ["https://example.org/source-1", "https://en.wikipedia.org/wiki/Topic_1"],
+        "tools_used": ["search", "wikipedia"],
+        "confidence": "medium",
+        "suggested_followups": ["Follow-up question"],
+    }
+)
+PROSE = "Research notes without structure: " + REPORT.replace("{", "(").replace("}", ")")
+SEARCH_RESULT = " ".join(
+    f"snippet: Result {index} about the query, link: https://example.org/source-{index}," for index in range(1, 6)
+)
+WIKI_RESULT = "Page: Topic\nSummary: " + REPORT[:1500]
+
+_calls: Counter = Counter()
+_calls_lock = threading.Lock()
+
+
+def record_call(stage: str) -> None:
+    with _calls_lock:
+        _calls[stage] += 1
+
+
+def take_calls() -> Counter:
+    with _calls_lock:
+        snapshot = Counter(_calls)
+        _calls.clear()
+        return snapshot
+
+
+def model_stage(messages: list) -> str:
+    first = messages[0] if messages else None
+    if isinstance(first, SystemMessage) and first.content == core.NORMALIZE_SYSTEM_PROMPT:
+        return "normalize"
+    if isinstance(first, SystemMessage) and first.content == core.DIRECT_SYSTEM_PROMPT:
+        return "direct"
+    return "agent"
+
+
+class ScriptedChatModel(BaseChatModel):
+    scenario: str = "happy"
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-benchmark"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def reply(self, messages: list) -> AIMessage:
+        stage = model_stage(messages)
+        record_call(stage)
+        if stage == "normalize":
+            return AIMessage(content=PROSE if self.scenario == "fallback" else ANSWER)
+        if stage == "direct":
+            return AIMessage(content=ANSWER)
+        if self.scenario == "direct":
+            raise RuntimeError("Scripted provider error: tool use is not supported for this model.")
+        if not any(isinstance(message, ToolMessage) for message in messages):
+            return AIMessage(
+                content="Looking this up.",
+                tool_calls=[
+                    {"name": "search", "args": {"__arg1": "benchmark query"}, "id": uuid.uuid4().hex},
+                    {"name": "wikipedia", "args": {"__arg1": "benchmark query"}, "id": uuid.uuid4().hex},
+                ],
+            )
+        return AIMessage(content=ANSWER if self.scenario == "happy" else PROSE)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.reply(messages))])
+
+
+def fake_tools(latency: float) -> list[Tool]:
+    def local(result: str):
+        def run(query: str) -> str:
+            if latency:
+                time.sleep(latency)
+            return result
+
+        async def arun(query: str) -> str:
+            if latency:
+                await asyncio.sleep(latency)
+            return result
+
+        return run, arun
+
+    search_run, search_arun = local(SEARCH_RESULT)
+    wiki_run, wiki_arun = local(WIKI_RESULT)
+    return [
+        Tool(name=search_tool.name, func=search_run, coroutine=search_arun, description=search_tool.description),
+        Tool(name=wiki_tool.name, func=wiki_run, coroutine=wiki_arun, description=wiki_tool.description),
+    ]
+
+
+def install(scenario: str, llm_latency: float, tool_latency: float) -> None:
+    core.set_llm_factory(lambda *args, **kwargs: ScriptedChatModel(scenario=scenario, latency=llm_latency))
+    core.set_agent_tools(fake_tools(tool_latency))
+
+
+def research(index: int) -> float:
+    start = time.perf_counter()
+    core.perform_research(PROVIDER, "benchmark-key", MODEL, f"Benchmark question {index}", use_cache=False)
+    return time.perf_counter() - start
+
+
+async def aresearch(index: int, semaphore: asyncio.Semaphore) -> float:
+    async with semaphore:
+        start = time.perf_counter()
+        await core.aperform_research(PROVIDER, "benchmark-key", MODEL, f"Benchmark question {index}", use_cache=False)
+        return time.perf_counter() - start
+
+
+def run_sync(requests: int, concurrency: int) -> list:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(research, index) for index in range(requests)]
+        return [future.exception() or future.result() for future in futures]
+
+
+async def run_async(requests: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(aresearch(index, semaphore) for index in range(requests)), return_exceptions=True)
+
+
+def measure(scenario: str, mode: str, concurrency: int, requests: int, warmup: int) -> dict:
+    runner = run_sync if mode == "sync" else lambda *args: asyncio.run(run_async(*args))
+    if warmup:
+        runner(warmup, min(warmup, concurrency))
+    take_calls()
+
+    start = time.perf_counter()
+    outcomes = runner(requests, concurrency)
+    wall = time.perf_counter() - start
+    calls = take_calls()
+
+    latencies = [value * 1000 for value in outcomes if isinstance(value, float)]
+    errors = [repr(value) for value in outcomes if not isinstance(value, float)]
+    return {
+        "scenario": scenario,
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p90": round(percentile(latencies, 0.90), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+        "model_calls_per_request": {stage: round(count / requests, 2) for stage, count in sorted(calls.items())},
+    }
+
+
+def import_profile(module: str) -> tuple[float, list[str]]:
+    code = f"import json, sys, {module}; print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = 0
+    for line in completed.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1])
+    return cumulative / 1000, json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure_imports(budget_ms: float, repeat: int = 3) -> list[dict]:
+    results = []
+    for module in IMPORT_MODULES:
+        samples = [import_profile(module) for _ in range(repeat)]
+        import_ms = min(sample[0] for sample in samples)
+        heavy = samples[-1][1]
+        results.append(
+            {
+                "module": module,
+                "import_ms": round(import_ms, 1),
+                "budget_ms": budget_ms,
+                "heavy_modules_loaded": heavy,
+                "within_budget": import_ms <= budget_ms and not heavy,
+            }
+        )
+        print(f"{module:>14} {import_ms:>8.1f} ms  heavy: {', '.join(heavy) or 'none'}", file=sys.stderr)
+    return results
+
+
+def concurrency_levels(value: str) -> list[int]:
+    try:
+        levels = [int(item) for item in value.split(",") if item.strip()]
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Expected comma-separated integers, got {value!r}.") from exc
+    if not levels or min(levels) < 1:
+        raise argparse.ArgumentTypeError("Concurrency levels must be positive integers.")
+    return levels
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline perform_research benchmark with a scripted model and local tools.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS, help="Research paths to measure.")
+    parser.add_argument("--concurrency", type=concurrency_levels, default=[1, 4, 16], help="Comma-separated levels, e.g. 1,4,16.")
+    parser.add_argument("--requests", type=int, default=40, help="Measured requests per scenario and concurrency level.")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured requests before each measurement.")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync", help="perform_research or aperform_research.")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Simulated seconds per model call.")
+    parser.add_argument("--tool-latency", type=float, default=0.01, help="Simulated seconds per tool call.")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+    parser.add_argument("--imports", action="store_true", help="Check cold import time of the entry modules instead.")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS, help="Import time allowed per module.")
+    return parser.parse_args(argv)
+
+
+def write_report(report: dict, output: str | None) -> None:
+    payload = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as handle:
+            handle.write(payload + "\n")
+    else:
+        print(payload)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.imports:
+        results = measure_imports(args.import_budget_ms)
+        write_report(
+            {
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "imports": results,
+            },
+            args.output,
+        )
+        if not all(result["within_budget"] for result in results):
+            raise SystemExit(1)
+        return
+
+    # Benchmarks must not depend on tracing endpoints configured in .env.
+    os.environ["LANGSMITH_TRACING"] = os.environ["LANGCHAIN_TRACING_V2"] = "false"
+
+    results = []
+    try:
+        for scenario in args.scenarios:
+            install(scenario, args.llm_latency, args.tool_latency)
+            for concurrency in args.concurrency:
+                result = measure(scenario, args.mode, concurrency, args.requests, args.warmup)
+                results.append(result)
+                print(
+                    f"{scenario:>9} c={concurrency:<3} {result['throughput_rps']:>8.2f} req/s  "
+                    f"p50 {result['latency_ms']['p50']:>9.2f} ms  p99 {result['latency_ms']['p99']:>9.2f} ms  "
+                    f"errors {result['errors']}",
+                    file=sys.stderr,
+                )
+    finally:
+        core.set_llm_factory(None)
+        core.set_agent_tools(None)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "mode": args.mode,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "llm_latency": args.llm_latency,
+            "tool_latency": args.tool_latency,
+        },
+        "results": results,
+    }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
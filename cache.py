@@ -0,0 +1,175 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+CACHE_ENABLED = os.getenv("RESEARCH_CACHE", "1").strip().lower() not in {"0", "false", "no", "off"}
+CACHE_PATH = Path(
+    os.getenv("RESEARCH_CACHE_PATH", "")
+    or Path(__file__).resolve().parent / ".cache" / "research_cache.sqlite3"
+)
+TOOL_CACHE_TTLS = {
+    "search": float(os.getenv("SEARCH_CACHE_TTL", "3600")),
+    "wikipedia": float(os.getenv("WIKI_CACHE_TTL", "86400")),
+}
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "5000"))
+
+
+def normalize_query(query: str) -> str:
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" \t\n?!.,;:\"'")
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    # Connections run in autocommit mode, so a write that must be atomic across processes opens its own transaction.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+class SQLiteCache:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+
+    def count(self, namespace: str, event: str) -> None:
+        with self._stats_lock:
+            self._stats[(namespace, event)] += 1
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        with self._stats_lock:
+            snapshot: dict[str, dict[str, int]] = {}
+            for (namespace, event), value in self._stats.items():
+                snapshot.setdefault(namespace, {})[event] = value
+            return snapshot
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (namespace, accessed_at)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str, ttl: float | None = None) -> str | None:
+        if not CACHE_ENABLED:
+            return None
+        now = time.time()
+        try:
+            conn = self.connect()
+            row = conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None:
+                self.count(namespace, "misses")
+                return None
+            if ttl is not None and now - row[1] > ttl:
+                self.count(namespace, "expired")
+                return None
+            conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+            self.count(namespace, "hits")
+            return row[0]
+        except sqlite3.Error:
+            self.count(namespace, "errors")
+            return None
+
+    def set(self, namespace: str, key: str, value: str, max_entries: int | None = None) -> list[str]:
+        if not CACHE_ENABLED:
+            return []
+        now = time.time()
+        evicted: list[str] = []
+        try:
+            conn = self.connect()
+            with transaction(conn):
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, value, now, now),
+                )
+                if max_entries:
+                    evicted = [
+                        row[0]
+                        for row in conn.execute(
+                            "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?",
+                            (namespace, max_entries),
+                        )
+                    ]
+                    conn.executemany(
+                        "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                        [(namespace, evicted_key) for evicted_key in evicted],
+                    )
+            self.count(namespace, "stores")
+        except sqlite3.Error:
+            return []
+        return evicted
+
+    def items(self, namespace: str) -> list[tuple[str, str]]:
+        if not CACHE_ENABLED:
+            return []
+        try:
+            return self.connect().execute(
+                "SELECT key, value FROM cache_entries WHERE namespace = ? ORDER BY accessed_at DESC",
+                (namespace,),
+            ).fetchall()
+        except sqlite3.Error:
+            return []
+
+    def delete(self, namespace: str, key: str) -> None:
+        try:
+            self.connect().execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error:
+            pass
+
+    def clear(self, namespace: str | None = None) -> None:
+        try:
+            if namespace is None:
+                self.connect().execute("DELETE FROM cache_entries")
+            else:
+                self.connect().execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+        except sqlite3.Error:
+            pass
+
+
+cache = SQLiteCache(CACHE_PATH)
+
+
+def get_tool_result(tool: str, query: str) -> str | None:
+    return cache.get(tool, normalize_query(query), TOOL_CACHE_TTLS.get(tool))
+
+
+def store_tool_result(tool: str, query: str, result: str) -> None:
+    if result and result.strip():
+        cache.set(tool, normalize_query(query), result, TOOL_CACHE_MAX_ENTRIES)
@@ -1,19 +1,39 @@
+from __future__ import annotations
+
+import asyncio
 import json
 import os
 import re
 import uuid
 import builtins
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Iterable
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Hashable, Iterable, Iterator
 
 from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_openai import ChatOpenAI
-from langgraph.prebuilt import create_react_agent
 from pydantic import BaseModel, Field
 
-from tools import save_tool, search_tool, wiki_tool
+from cache import cache, normalize_query
+from hedging import afirst_success, first_success
+from jsonrepair import repair_json, repair_stats
+from jsonstream import IncrementalJSONParser, find_json_object
+from memory import research_memory
+from metrics import span, track_run
+from neardup import NearDuplicateIndex
+from ratelimit import acall_with_rate_limit, call_with_rate_limit, is_rate_limit_error, requests_per_minute
+from singleflight import SingleFlight
+from store import research_run, research_store
+from transcript import FALLBACK_TRANSCRIPT_TOKENS, Transcript
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.output_parsers import PydanticOutputParser
+    from langchain_openai import ChatOpenAI
 
 
 builtins.uuid = uuid  # Compatibility shim for newer Python/LangGraph combinations.
@@ -63,6 +83,23 @@ MODEL_OPTIONS: list[ModelOption] = [
 ]
 
 
+PROVIDER_BASE_URLS = {
+    PROVIDER_OPENROUTER: "https://openrouter.ai/api/v1",
+    PROVIDER_NVIDIA_NIM: "https://integrate.api.nvidia.com/v1",
+}
+
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "8"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "120"))
+NORMALIZE_HEDGE_DELAY = float(os.getenv("NORMALIZE_HEDGE_DELAY", "3"))
+RESEARCH_CACHE_TTL = float(os.getenv("RESEARCH_CACHE_TTL", "86400"))
+RESEARCH_CACHE_MAX_ENTRIES = int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", "2000"))
+RESEARCH_MAX_TOKENS = int(os.getenv("RESEARCH_MAX_TOKENS", "120000"))
+RESEARCH_MAX_TOOL_CALLS = int(os.getenv("RESEARCH_MAX_TOOL_CALLS", "10"))
+RESEARCH_MAX_TURNS = int(os.getenv("RESEARCH_MAX_TURNS", "8"))
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+
+
 PROVIDER_ENV_KEYS = {
     PROVIDER_OPENROUTER: "OPENROUTER_API_KEY",
     PROVIDER_NVIDIA_NIM: "NVIDIA_API_KEY",
@@ -119,42 +156,270 @@ def provider_help_url(provider: str) -> str:
     return "https://openrouter.ai/keys"
 
 
-def build_llm(provider: str, api_key: str, model_name: str, json_mode: bool = False) -> ChatOpenAI:
+class ClientPool:
+    def __init__(self, max_size: int):
+        self.max_size = max(1, max_size)
+        self._items: OrderedDict[Hashable, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, factory: Callable[[], object]) -> object:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+
+        # Build outside the lock so a slow graph compile does not block other keys.
+        value = factory()
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+            self._items[key] = value
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+_llm_pool = ClientPool(LLM_POOL_SIZE)
+_agent_pool = ClientPool(AGENT_POOL_SIZE)
+_http_clients: dict[str, httpx.Client] = {}
+_http_lock = threading.Lock()
+_llm_factory: Callable[..., ChatOpenAI] | None = None
+_agent_tools: list | None = None
+
+
+def key_fingerprint(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+@lru_cache(maxsize=1)
+def get_parser() -> PydanticOutputParser:
+    from langchain_core.output_parsers import PydanticOutputParser
+
+    return PydanticOutputParser(pydantic_object=ResearchResponse)
+
+
+def get_http_client(provider: str) -> httpx.Client:
+    import httpx
+
+    base_url = PROVIDER_BASE_URLS[provider]
+    with _http_lock:
+        client = _http_clients.get(base_url)
+        if client is None:
+            client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+                ),
+                timeout=httpx.Timeout(600.0, connect=10.0),
+            )
+            _http_clients[base_url] = client
+        return client
+
+
+def prime_stream(stream: Iterator) -> Iterator:
+    # Pull the first chunk so request errors such as 429 surface before any token is yielded.
+    try:
+        first = next(stream)
+    except StopIteration:
+        return iter(())
+    return itertools.chain([first], stream)
+
+
+async def aprime_stream(stream: AsyncIterator) -> AsyncIterator:
+    try:
+        first = await anext(stream)
+    except StopAsyncIteration:
+        first = None
+
+    async def chained():
+        if first is None:
+            return
+        yield first
+        async for chunk in stream:
+            yield chunk
+
+    return chained()
+
+
+def llm_usage(result: object) -> dict[str, int]:
+    for generation in getattr(result, "generations", None) or []:
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage:
+            return {"input_tokens": usage.get("input_tokens", 0), "output_tokens": usage.get("output_tokens", 0)}
+    token_usage = (getattr(result, "llm_output", None) or {}).get("token_usage") or {}
+    if token_usage:
+        return {
+            "input_tokens": token_usage.get("prompt_tokens", 0),
+            "output_tokens": token_usage.get("completion_tokens", 0),
+        }
+    return {}
+
+
+@lru_cache(maxsize=1)
+def rate_limited_chat_class() -> type[ChatOpenAI]:
+    from langchain_openai import ChatOpenAI
+
+    class RateLimitedChatOpenAI(ChatOpenAI):
+        rate_limit_key: str = ""
+        requests_per_minute: float = 0.0
+
+        def _stream(self, *args, **kwargs):
+            stream = super()._stream
+            with span("llm", self.model_name, streaming=True) as timing:
+                for chunk in call_with_rate_limit(
+                    self.rate_limit_key,
+                    self.requests_per_minute,
+                    lambda: prime_stream(stream(*args, **kwargs)),
+                ):
+                    usage = getattr(chunk.message, "usage_metadata", None)
+                    if usage:
+                        timing.set(input_tokens=usage.get("input_tokens", 0), output_tokens=usage.get("output_tokens", 0))
+                    yield chunk
+
+        async def _astream(self, *args, **kwargs):
+            astream = super()._astream
+            with span("llm", self.model_name, streaming=True) as timing:
+                chunks = await acall_with_rate_limit(
+                    self.rate_limit_key,
+                    self.requests_per_minute,
+                    lambda: aprime_stream(astream(*args, **kwargs)),
+                )
+                async for chunk in chunks:
+                    usage = getattr(chunk.message, "usage_metadata", None)
+                    if usage:
+                        timing.set(input_tokens=usage.get("input_tokens", 0), output_tokens=usage.get("output_tokens", 0))
+                    yield chunk
+
+        def _generate(self, *args, **kwargs):
+            generate = super()._generate
+            with span("llm", self.model_name) as timing:
+                result = call_with_rate_limit(self.rate_limit_key, self.requests_per_minute, lambda: generate(*args, **kwargs))
+                timing.set(**llm_usage(result))
+            return result
+
+        async def _agenerate(self, *args, **kwargs):
+            agenerate = super()._agenerate
+            with span("llm", self.model_name) as timing:
+                result = await acall_with_rate_limit(
+                    self.rate_limit_key,
+                    self.requests_per_minute,
+                    lambda: agenerate(*args, **kwargs),
+                )
+                timing.set(**llm_usage(result))
+            return result
+
+    return RateLimitedChatOpenAI
+
+
+def __getattr__(name: str):
+    if name == "RateLimitedChatOpenAI":
+        return rate_limited_chat_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def build_llm(
+    provider: str,
+    api_key: str,
+    model_name: str,
+    json_mode: bool = False,
+    streaming: bool = False,
+) -> ChatOpenAI:
     extra_kwargs = {"model_kwargs": {"response_format": {"type": "json_object"}}} if json_mode else {}
     max_tokens = 4096 if provider == PROVIDER_OPENROUTER else 8192
-
+    # Retries are handled by the shared rate limiter so 429s feed its adaptive rate.
+    limit_kwargs = {
+        "rate_limit_key": f"{provider}:{model_name}",
+        "requests_per_minute": requests_per_minute(provider, model_name),
+        "max_retries": 0,
+    }
+    stream_kwargs = {"streaming": True, "disable_streaming": False, "stream_usage": True} if streaming else {
+        "streaming": False,
+        "disable_streaming": True,
+    }
+
+    chat_class = rate_limited_chat_class()
     if provider == PROVIDER_NVIDIA_NIM:
-        return ChatOpenAI(
+        return chat_class(
             model=model_name,
             openai_api_key=api_key,
-            openai_api_base="https://integrate.api.nvidia.com/v1",
-            streaming=False,
-            disable_streaming=True,
+            openai_api_base=PROVIDER_BASE_URLS[provider],
+            http_client=get_http_client(provider),
             temperature=0.2,
             max_completion_tokens=max_tokens,
+            **limit_kwargs,
+            **stream_kwargs,
             **extra_kwargs,
         )
 
-    return ChatOpenAI(
+    return chat_class(
         model=model_name,
         openai_api_key=api_key,
-        openai_api_base="https://openrouter.ai/api/v1",
-        streaming=False,
-        disable_streaming=True,
+        openai_api_base=PROVIDER_BASE_URLS[provider],
+        http_client=get_http_client(provider),
         temperature=0.2,
         max_completion_tokens=max_tokens,
         default_headers={
             "HTTP-Referer": "https://github.com/AI-Research-Assistant",
             "X-Title": "AI Research Assistant",
         },
+        **limit_kwargs,
+        **stream_kwargs,
         **extra_kwargs,
     )
 
 
-def build_agent(provider: str, api_key: str, model_name: str):
-    parser = PydanticOutputParser(pydantic_object=ResearchResponse)
-    llm = build_llm(provider, api_key, model_name)
-    tools = [search_tool, wiki_tool, save_tool]
+def get_llm(
+    provider: str,
+    api_key: str,
+    model_name: str,
+    json_mode: bool = False,
+    streaming: bool = False,
+) -> ChatOpenAI:
+    key = (provider, model_name, json_mode, streaming, key_fingerprint(api_key))
+    factory = _llm_factory or build_llm
+    return _llm_pool.get(
+        key,
+        lambda: factory(provider, api_key, model_name, json_mode=json_mode, streaming=streaming),
+    )
+
+
+def set_llm_factory(factory: Callable[..., ChatOpenAI] | None) -> None:
+    global _llm_factory
+    _llm_factory = factory
+    clear_pools()
+
+
+def get_agent_tools() -> list:
+    if _agent_tools is not None:
+        return _agent_tools
+    from tools import get_tools
+
+    tools = get_tools()
+    return [tools["memory_tool"], tools["search_tool"], tools["wiki_tool"], tools["fetch_tool"], tools["save_tool"]]
+
+
+def set_agent_tools(tools: list | None) -> None:
+    global _agent_tools
+    _agent_tools = tools
+    clear_pools()
+
+
+def build_agent(provider: str, api_key: str, model_name: str, streaming: bool = False):
+    from langgraph.prebuilt import create_react_agent
+
+    parser = get_parser()
+    llm = get_llm(provider, api_key, model_name, streaming=streaming)
+    tools = get_agent_tools()
 
     system_prompt = f"""
 You are an AI research assistant. Use the available tools when the question benefits
@@ -162,7 +427,10 @@ from current web context, encyclopedia context, or saving intermediate notes.
 
 Research rules:
 - Use 2-6 focused tool calls for broad research questions, then stop.
+- Check research_memory first. If an earlier report already answers the question and is recent enough for the topic, build on it and only look up what is missing or may have changed.
+- When you need several lookups, such as a web search and a Wikipedia lookup, request them together in one turn so they run in parallel.
 - Prefer current web search for modern or fast-moving topics.
+- When a search result looks like a strong source, read it with fetch_page (several URLs in one call) instead of searching again.
 - Put direct URLs in source_links. Also include readable source names in sources.
 - Separate established facts from uncertainty.
 - Keep the summary clear, neutral, and useful.
@@ -178,21 +446,18 @@ Return only JSON matching this schema:
     return create_react_agent(llm, tools, prompt=system_prompt), parser
 
 
-def extract_json(text: str) -> dict:
-    text = text.strip()
-    if text.startswith("```"):
-        text = re.sub(r"^```(?:json)?\s*", "", text)
-        text = re.sub(r"\s*```$", "", text)
+def get_agent(provider: str, api_key: str, model_name: str, streaming: bool = False):
+    key = (provider, model_name, streaming, key_fingerprint(api_key))
+    return _agent_pool.get(key, lambda: build_agent(provider, api_key, model_name, streaming=streaming))
 
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
 
-    match = re.search(r"\{[\s\S]*\}", text)
-    if not match:
-        raise ValueError("No JSON object found in the model response.")
-    return json.loads(match.group())
+def clear_pools() -> None:
+    _agent_pool.clear()
+    _llm_pool.clear()
+
+
+def extract_json(text: str) -> dict:
+    return find_json_object(text)
 
 
 def stringify_report(value: object) -> str:
@@ -254,18 +519,44 @@ def coerce_research_response(data: dict, query: str = "", transcript: str = "")
     return enrich_response(ResearchResponse(**data), query, transcript)
 
 
+def require_answer(response: ResearchResponse) -> ResearchResponse:
+    if not response.summary.strip() or not response.detailed_report.strip():
+        raise ValueError("The parsed response has no summary or detailed_report.")
+    return response
+
+
 def parse_response(parser: PydanticOutputParser, messages: Iterable[object]) -> ResearchResponse:
     for message in reversed(list(messages)):
         content = getattr(message, "content", None)
-        if isinstance(content, str) and "{" in content and "}" in content:
+        if getattr(message, "type", "") == "ai" and isinstance(content, str) and "{" in content and "}" in content:
             try:
-                return coerce_research_response(extract_json(content))
+                response = coerce_research_response(extract_json(content))
             except Exception:
-                return parser.parse(content)
+                response = parser.parse(content)
+            return require_answer(response)
 
     raise ValueError("No structured final response was returned by the model.")
 
 
+def repaired_response(content: str, query: str, transcript: str, stage: str) -> ResearchResponse:
+    try:
+        result = repair_json(content)
+        response = require_answer(coerce_research_response(result.data, query, transcript))
+    except Exception:
+        repair_stats.record(stage, None)
+        raise
+    repair_stats.record(stage, result)
+    return response
+
+
+def repair_final_answer(messages: Iterable[object], query: str, transcript: str = "") -> ResearchResponse:
+    for message in reversed(list(messages)):
+        content = getattr(message, "content", None)
+        if getattr(message, "type", "") == "ai" and isinstance(content, str) and "{" in content:
+            return repaired_response(content, query, transcript, "final_answer")
+    raise ValueError("No final answer to repair.")
+
+
 def extract_links(text: str) -> list[str]:
     urls = re.findall(r"https?://[^\s\]\)\"'>,]+", text)
     cleaned = []
@@ -299,51 +590,31 @@ def enrich_response(response: ResearchResponse, query: str = "", transcript: str
     return response
 
 
-def render_transcript(messages: Iterable[object], max_chars: int = 14000) -> str:
-    rendered = []
-    for message in messages:
-        role = getattr(message, "type", message.__class__.__name__)
-        name = getattr(message, "name", None)
-        content = getattr(message, "content", "")
-        tool_calls = getattr(message, "tool_calls", None)
-
-        if isinstance(content, list):
-            content = json.dumps(content, ensure_ascii=False)
-        elif content is None:
-            content = ""
-
-        prefix = f"{role}"
-        if name:
-            prefix += f":{name}"
-        rendered.append(f"{prefix}: {content}")
-
-        if tool_calls:
-            rendered.append(f"{role}:tool_calls: {json.dumps(tool_calls, ensure_ascii=False)}")
-
-    transcript = "\n\n".join(rendered)
-    if len(transcript) <= max_chars:
-        return transcript
-    return transcript[-max_chars:]
-
-
-def fallback_response(query: str, messages: Iterable[object], error: Exception | None = None) -> ResearchResponse:
-    transcript = render_transcript(messages, max_chars=6000)
+def fallback_response(
+    query: str,
+    messages: Iterable[object],
+    error: Exception | None = None,
+    transcript: Transcript | None = None,
+) -> ResearchResponse:
+    messages = list(messages)
+    transcript = (transcript or Transcript(messages)).render(FALLBACK_TRANSCRIPT_TOKENS)
     candidates = []
     for message in messages:
         content = getattr(message, "content", None)
-        if isinstance(content, str) and content.strip():
+        # Tool output is JSON too (search results are a list of objects), so only the model's own turns qualify.
+        if getattr(message, "type", "") == "ai" and isinstance(content, str) and content.strip():
             candidates.append(content.strip())
 
     for candidate in reversed(candidates):
         if "{" in candidate and "}" in candidate:
             try:
-                return coerce_research_response(extract_json(candidate), query, transcript)
+                return require_answer(coerce_research_response(extract_json(candidate), query, transcript))
             except Exception:
                 pass
 
     summary = candidates[-1] if candidates else "Research completed, but the model did not return structured output."
     urls = sorted(set(re.findall(r"https?://[^\s\]\)\"'>]+", transcript)))
-    tools_used = sorted(set(re.findall(r"(search|wikipedia|save_text_to_file)", transcript, flags=re.IGNORECASE)))
+    tools_used = sorted(set(re.findall(r"(research_memory|search|wikipedia|fetch_page|save_note)", transcript, flags=re.IGNORECASE)))
     if error:
         summary = f"{summary}\n\nStructured-output fallback was used because: {error}"
 
@@ -360,16 +631,7 @@ def fallback_response(query: str, messages: Iterable[object], error: Exception |
     )
 
 
-def normalize_response(
-    provider: str,
-    api_key: str,
-    model_name: str,
-    query: str,
-    messages: Iterable[object],
-) -> ResearchResponse:
-    transcript = render_transcript(messages)
-    schema = ResearchResponse.model_json_schema()
-    system_prompt = """
+NORMALIZE_SYSTEM_PROMPT = """
 You convert research-agent transcripts into valid JSON.
 Return only one JSON object. Do not use markdown, code fences, comments, or prose.
 Use only information present in the transcript. Do not invent sources.
@@ -378,6 +640,18 @@ The detailed_report field must be a comprehensive multi-section report, not just
 The detailed_report field must be one string. Do not return an array or object for detailed_report.
 Extract every direct URL you can find into source_links.
 """
+
+DIRECT_SYSTEM_PROMPT = """
+You are an AI research assistant. Return only valid JSON with these keys:
+topic, summary, detailed_report, key_findings, sources, source_links, tools_used, confidence, suggested_followups.
+Use an empty sources list if no external tools were available. Do not use markdown.
+The detailed_report field must be a comprehensive multi-section report, not just a summary.
+The detailed_report field must be one string. Do not return an array or object for detailed_report.
+"""
+
+
+def normalization_messages(query: str, transcript: str) -> list:
+    schema = ResearchResponse.model_json_schema()
     user_prompt = f"""
 Original query:
 {query}
@@ -388,34 +662,12 @@ Required JSON schema:
 Research transcript:
 {transcript}
 """
+    from langchain_core.messages import HumanMessage, SystemMessage
 
-    attempts = [
-        build_llm(provider, api_key, model_name, json_mode=True),
-        build_llm(provider, api_key, model_name, json_mode=False),
-    ]
-
-    last_error: Exception | None = None
-    for llm in attempts:
-        try:
-            response = llm.invoke([SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)])
-            content = getattr(response, "content", "")
-            if isinstance(content, list):
-                content = json.dumps(content, ensure_ascii=False)
-            return coerce_research_response(extract_json(str(content)), query, transcript)
-        except Exception as exc:
-            last_error = exc
-
-    return fallback_response(query, messages, last_error)
+    return [SystemMessage(content=NORMALIZE_SYSTEM_PROMPT), HumanMessage(content=user_prompt)]
 
 
-def direct_structured_response(provider: str, api_key: str, model_name: str, query: str, error: Exception) -> ResearchResponse:
-    system_prompt = """
-You are an AI research assistant. Return only valid JSON with these keys:
-topic, summary, detailed_report, key_findings, sources, source_links, tools_used, confidence, suggested_followups.
-Use an empty sources list if no external tools were available. Do not use markdown.
-The detailed_report field must be a comprehensive multi-section report, not just a summary.
-The detailed_report field must be one string. Do not return an array or object for detailed_report.
-"""
+def direct_messages(query: str, error: Exception) -> list:
     user_prompt = f"""
 The tool-using research agent failed with this error:
 {error}
@@ -423,40 +675,580 @@ The tool-using research agent failed with this error:
 Answer the user's query directly in valid JSON:
 {query}
 """
-    messages = [SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)]
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    return [SystemMessage(content=DIRECT_SYSTEM_PROMPT), HumanMessage(content=user_prompt)]
+
+
+def parse_llm_content(response: object, query: str, transcript: str = "") -> ResearchResponse:
+    content = getattr(response, "content", "")
+    if isinstance(content, list):
+        content = json.dumps(content, ensure_ascii=False)
+    try:
+        return require_answer(coerce_research_response(extract_json(str(content)), query, transcript))
+    except Exception:
+        return repaired_response(str(content), query, transcript, "normalize")
 
-    for json_mode in (True, False):
-        try:
-            response = build_llm(provider, api_key, model_name, json_mode=json_mode).invoke(messages)
-            content = getattr(response, "content", "")
-            if isinstance(content, list):
-                content = json.dumps(content, ensure_ascii=False)
-            parsed = coerce_research_response(extract_json(str(content)), query)
-            if not parsed.tools_used:
-                parsed.tools_used = ["direct_model_fallback"]
-            if not parsed.confidence:
-                parsed.confidence = "low"
-            return parsed
-        except Exception:
-            continue
+
+def mark_direct_response(parsed: ResearchResponse) -> ResearchResponse:
+    if not parsed.tools_used:
+        parsed.tools_used = ["direct_model_fallback"]
+    if not parsed.confidence:
+        parsed.confidence = "low"
+    return parsed
+
+
+def direct_fallback(query: str, error: Exception) -> ResearchResponse:
+    from langchain_core.messages import HumanMessage
 
     return fallback_response(query, [HumanMessage(content=query), HumanMessage(content=str(error))], error)
 
 
-def perform_research(provider: str, api_key: str, model_name: str, query: str) -> ResearchResponse:
-    agent, parser = build_agent(provider, api_key, model_name)
+def structured_normalization(provider: str, api_key: str, model_name: str, query: str, transcript: str) -> ResearchResponse:
+    prompt = normalization_messages(query, transcript)
+
+    def attempt(json_mode: bool) -> Callable[[], ResearchResponse]:
+        llm = get_llm(provider, api_key, model_name, json_mode=json_mode)
+        return lambda: parse_llm_content(llm.invoke(prompt), query, transcript)
+
+    return first_success([attempt(True), attempt(False)], NORMALIZE_HEDGE_DELAY, is_rate_limit_error)
+
+
+async def astructured_normalization(
+    provider: str,
+    api_key: str,
+    model_name: str,
+    query: str,
+    transcript: str,
+) -> ResearchResponse:
+    prompt = normalization_messages(query, transcript)
+
+    def attempt(json_mode: bool) -> Callable[[], Awaitable[ResearchResponse]]:
+        llm = get_llm(provider, api_key, model_name, json_mode=json_mode)
+
+        async def run() -> ResearchResponse:
+            return parse_llm_content(await llm.ainvoke(prompt), query, transcript)
+
+        return run
+
+    return await afirst_success([attempt(True), attempt(False)], NORMALIZE_HEDGE_DELAY, is_rate_limit_error)
+
+
+def normalize_response(
+    provider: str,
+    api_key: str,
+    model_name: str,
+    query: str,
+    messages: Iterable[object],
+) -> ResearchResponse:
+    messages = list(messages)
+    transcript = Transcript(messages)
+    try:
+        return structured_normalization(provider, api_key, model_name, query, transcript.render())
+    except Exception as exc:
+        return fallback_response(query, messages, exc, transcript)
+
+
+async def anormalize_response(
+    provider: str,
+    api_key: str,
+    model_name: str,
+    query: str,
+    messages: Iterable[object],
+) -> ResearchResponse:
+    messages = list(messages)
+    transcript = Transcript(messages)
     try:
-        result = agent.invoke(
-            {"messages": [HumanMessage(content=query)]},
-            {"recursion_limit": 20},
-        )
+        return await astructured_normalization(provider, api_key, model_name, query, transcript.render())
     except Exception as exc:
-        return direct_structured_response(provider, api_key, model_name, query, exc)
+        return fallback_response(query, messages, exc, transcript)
+
+
+def structured_direct_answer(provider: str, api_key: str, model_name: str, query: str, error: Exception) -> ResearchResponse:
+    prompt = direct_messages(query, error)
+
+    def attempt(json_mode: bool) -> Callable[[], ResearchResponse]:
+        llm = get_llm(provider, api_key, model_name, json_mode=json_mode)
+        return lambda: mark_direct_response(parse_llm_content(llm.invoke(prompt), query))
+
+    return first_success([attempt(True), attempt(False)], NORMALIZE_HEDGE_DELAY, is_rate_limit_error)
+
 
+async def astructured_direct_answer(
+    provider: str,
+    api_key: str,
+    model_name: str,
+    query: str,
+    error: Exception,
+) -> ResearchResponse:
+    prompt = direct_messages(query, error)
+
+    def attempt(json_mode: bool) -> Callable[[], Awaitable[ResearchResponse]]:
+        llm = get_llm(provider, api_key, model_name, json_mode=json_mode)
+
+        async def run() -> ResearchResponse:
+            return mark_direct_response(parse_llm_content(await llm.ainvoke(prompt), query))
+
+        return run
+
+    return await afirst_success([attempt(True), attempt(False)], NORMALIZE_HEDGE_DELAY, is_rate_limit_error)
+
+
+def direct_structured_response(provider: str, api_key: str, model_name: str, query: str, error: Exception) -> ResearchResponse:
     try:
-        return enrich_response(parse_response(parser, result["messages"]), query, render_transcript(result["messages"]))
+        return structured_direct_answer(provider, api_key, model_name, query, error)
     except Exception:
-        return normalize_response(provider, api_key, model_name, query, result["messages"])
+        return direct_fallback(query, error)
+
+
+async def adirect_structured_response(
+    provider: str,
+    api_key: str,
+    model_name: str,
+    query: str,
+    error: Exception,
+) -> ResearchResponse:
+    try:
+        return await astructured_direct_answer(provider, api_key, model_name, query, error)
+    except Exception:
+        return direct_fallback(query, error)
+
+
+# Tool calls from one model turn run concurrently, up to max_concurrency, and return in call order.
+AGENT_CONFIG = {"recursion_limit": 20, "max_concurrency": TOOL_CONCURRENCY}
+
+
+def final_answer_chunk(payload: tuple) -> AIMessageChunk | None:
+    from langchain_core.messages import AIMessageChunk
+
+    chunk, metadata = payload
+    if metadata.get("langgraph_node") != "agent" or not isinstance(chunk, AIMessageChunk):
+        return None
+    if chunk.tool_call_chunks or not isinstance(chunk.content, str) or not chunk.content:
+        return None
+    return chunk
+
+
+class AnswerStream:
+    def __init__(
+        self,
+        on_token: Callable[[str], None] | None = None,
+        on_field: Callable[[str, object], None] | None = None,
+    ):
+        self.on_token = on_token
+        self.on_field = on_field
+        self.message_id: str | None = None
+        self.parser: IncrementalJSONParser | None = None
+
+    def feed(self, payload: tuple) -> None:
+        chunk = final_answer_chunk(payload)
+        if chunk is None:
+            return
+        if chunk.id != self.message_id:
+            # A new model turn starts a new candidate answer.
+            self.message_id = chunk.id
+            self.parser = IncrementalJSONParser(self.emit_field) if self.on_field else None
+        if self.on_token:
+            self.on_token(chunk.content)
+        if self.parser:
+            self.parser.feed(chunk.content)
+
+    def emit_field(self, name: str, value: object) -> None:
+        if name in ResearchResponse.model_fields:
+            self.on_field(name, value)
+
+
+@dataclass(frozen=True)
+class ResearchBudget:
+    max_tokens: int = RESEARCH_MAX_TOKENS
+    max_tool_calls: int = RESEARCH_MAX_TOOL_CALLS
+    max_turns: int = RESEARCH_MAX_TURNS
+
+
+def message_tokens(message: AIMessage, history: list) -> int:
+    usage = message.usage_metadata
+    if usage and usage.get("total_tokens"):
+        return usage["total_tokens"]
+    # Providers that omit usage are estimated at four characters per token.
+    return sum(len(str(item.content)) for item in history) // 4 + len(str(message.content)) // 4
+
+
+class BudgetTracker:
+    def __init__(self, budget: ResearchBudget):
+        self.budget = budget
+        self.tokens = 0
+        self.tool_calls = 0
+        self.turns = 0
+        self.stop_reason: str | None = None
+        self._seen = 0
+
+    def update(self, messages: list) -> bool:
+        from langchain_core.messages import AIMessage
+
+        for index in range(self._seen, len(messages)):
+            message = messages[index]
+            if isinstance(message, AIMessage):
+                self.turns += 1
+                self.tool_calls += len(message.tool_calls)
+                self.tokens += message_tokens(message, messages[:index])
+        self._seen = len(messages)
+
+        last = messages[-1] if messages else None
+        if not isinstance(last, AIMessage) or not last.tool_calls:
+            return False
+        # Only a turn that asks for more tools can be cut short; a final answer ends the run anyway.
+        budget = self.budget
+        if budget.max_turns and self.turns >= budget.max_turns:
+            self.stop_reason = "turns"
+        elif budget.max_tool_calls and self.tool_calls > budget.max_tool_calls:
+            self.stop_reason = "tool_calls"
+        elif budget.max_tokens and self.tokens >= budget.max_tokens:
+            self.stop_reason = "tokens"
+        return self.stop_reason is not None
+
+
+def run_agent(
+    agent,
+    query: str,
+    stream: AnswerStream | None = None,
+    tracker: BudgetTracker | None = None,
+    transcript: Transcript | None = None,
+) -> list:
+    from langchain_core.messages import HumanMessage
+
+    inputs = {"messages": [HumanMessage(content=query)]}
+    if stream is None and tracker is None:
+        return agent.invoke(inputs, AGENT_CONFIG)["messages"]
+
+    messages = []
+    stream_mode = ["messages", "values"] if stream else ["values"]
+    for mode, payload in agent.stream(inputs, AGENT_CONFIG, stream_mode=stream_mode):
+        if mode == "values":
+            messages = payload["messages"]
+            if transcript is not None:
+                transcript.extend(messages)
+            if tracker and tracker.update(messages):
+                break
+        else:
+            stream.feed(payload)
+    return messages
+
+
+async def arun_agent(
+    agent,
+    query: str,
+    stream: AnswerStream | None = None,
+    tracker: BudgetTracker | None = None,
+    transcript: Transcript | None = None,
+) -> list:
+    from langchain_core.messages import HumanMessage
+
+    inputs = {"messages": [HumanMessage(content=query)]}
+    if stream is None and tracker is None:
+        return (await agent.ainvoke(inputs, AGENT_CONFIG))["messages"]
+
+    messages = []
+    stream_mode = ["messages", "values"] if stream else ["values"]
+    async for mode, payload in agent.astream(inputs, AGENT_CONFIG, stream_mode=stream_mode):
+        if mode == "values":
+            messages = payload["messages"]
+            if transcript is not None:
+                transcript.extend(messages)
+            if tracker and tracker.update(messages):
+                break
+        else:
+            stream.feed(payload)
+    return messages
+
+
+def finalize_messages(
+    parser: PydanticOutputParser,
+    query: str,
+    messages: list,
+    transcript: Transcript | None = None,
+) -> ResearchResponse | None:
+    transcript = (transcript or Transcript(messages)).render()
+    try:
+        return enrich_response(parse_response(parser, messages), query, transcript)
+    except Exception:
+        pass
+    try:
+        return repair_final_answer(messages, query, transcript)
+    except Exception:
+        return None
+
+
+def run_research(
+    provider: str,
+    api_key: str,
+    model_name: str,
+    query: str,
+    stream: AnswerStream | None = None,
+    budget: ResearchBudget | None = None,
+) -> tuple[ResearchResponse, bool]:
+    agent, parser = get_agent(provider, api_key, model_name, streaming=stream is not None)
+    tracker = BudgetTracker(budget or ResearchBudget())
+    transcript = Transcript()
+    try:
+        with span("stage", "agent") as timing:
+            messages = run_agent(agent, query, stream, tracker, transcript)
+            if tracker.stop_reason:
+                timing.mark(f"budget_{tracker.stop_reason}")
+    except Exception as exc:
+        if is_rate_limit_error(exc):
+            raise
+        with span("stage", "direct"):
+            return direct_structured_response(provider, api_key, model_name, query, exc), False
+
+    transcript.extend(messages)
+    with span("stage", "parse") as timing:
+        if tracker.stop_reason:
+            # A budget stop ends on a tool-call turn, so there is no final answer to parse; normalize instead.
+            response = None
+            timing.mark("skipped")
+        else:
+            response = finalize_messages(parser, query, messages, transcript)
+            if response is None:
+                timing.mark("unparsed")
+    if response is not None:
+        return response, True
+    try:
+        with span("stage", "normalize"):
+            return structured_normalization(provider, api_key, model_name, query, transcript.render()), True
+    except Exception as exc:
+        with span("stage", "fallback"):
+            return fallback_response(query, messages, exc, transcript), False
+
+
+async def arun_research(
+    provider: str,
+    api_key: str,
+    model_name: str,
+    query: str,
+    stream: AnswerStream | None = None,
+    budget: ResearchBudget | None = None,
+) -> tuple[ResearchResponse, bool]:
+    agent, parser = get_agent(provider, api_key, model_name, streaming=stream is not None)
+    tracker = BudgetTracker(budget or ResearchBudget())
+    transcript = Transcript()
+    try:
+        with span("stage", "agent") as timing:
+            messages = await arun_agent(agent, query, stream, tracker, transcript)
+            if tracker.stop_reason:
+                timing.mark(f"budget_{tracker.stop_reason}")
+    except Exception as exc:
+        if is_rate_limit_error(exc):
+            raise
+        with span("stage", "direct"):
+            return await adirect_structured_response(provider, api_key, model_name, query, exc), False
+
+    transcript.extend(messages)
+    with span("stage", "parse") as timing:
+        if tracker.stop_reason:
+            # A budget stop ends on a tool-call turn, so there is no final answer to parse; normalize instead.
+            response = None
+            timing.mark("skipped")
+        else:
+            response = finalize_messages(parser, query, messages, transcript)
+            if response is None:
+                timing.mark("unparsed")
+    if response is not None:
+        return response, True
+    try:
+        with span("stage", "normalize"):
+            return await astructured_normalization(provider, api_key, model_name, query, transcript.render()), True
+    except Exception as exc:
+        with span("stage", "fallback"):
+            return fallback_response(query, messages, exc, transcript), False
+
+
+def research_cache_key(provider: str, model_name: str, query: str) -> str:
+    return json.dumps([provider, model_name, normalize_query(query)], ensure_ascii=False)
+
+
+def replay_fields(response: ResearchResponse, on_field: Callable[[str, object], None] | None) -> None:
+    if on_field:
+        for name, value in response.model_dump().items():
+            on_field(name, value)
+
+
+def cached_research(
+    provider: str,
+    model_name: str,
+    query: str,
+    max_age: float | None = None,
+    on_field: Callable[[str, object], None] | None = None,
+) -> ResearchResponse | None:
+    response = load_research(research_cache_key(provider, model_name, query), max_age)
+    if response is not None:
+        replay_fields(response, on_field)
+    return response
+
+
+def load_research(key: str, max_age: float | None = None) -> ResearchResponse | None:
+    max_age = RESEARCH_CACHE_TTL if max_age is None else max_age
+    payload = cache.get("research", key, max_age)
+    if payload is None:
+        return None
+    try:
+        return ResearchResponse.model_validate_json(payload)
+    except ValueError:
+        return None
+
+
+def research_index_entries() -> Iterator[tuple[str, str]]:
+    # Oldest first, so the index's own size bound drops the same entries the cache would.
+    for key, value in reversed(cache.items("research")):
+        try:
+            query = json.loads(key)[2]
+            topic = json.loads(value).get("topic", "")
+        except (ValueError, IndexError, AttributeError):
+            continue
+        yield key, query
+        if topic:
+            yield key, topic
+
+
+research_index = NearDuplicateIndex(research_index_entries, RESEARCH_CACHE_MAX_ENTRIES)
+
+
+def find_similar_research(
+    query: str,
+    provider: str | None = None,
+    model_name: str | None = None,
+    threshold: float | None = None,
+    limit: int = 3,
+    max_age: float | None = None,
+) -> list[tuple[float, str, ResearchResponse]]:
+    matches = []
+    for score, key in research_index.query(query, threshold, limit=limit * 4):
+        stored_provider, stored_model, stored_query = json.loads(key)
+        if provider and stored_provider != provider or model_name and stored_model != model_name:
+            continue
+        response = load_research(key, max_age)
+        if response is None:
+            continue
+        matches.append((score, stored_query, response))
+        if len(matches) >= limit:
+            break
+    return matches
+
+
+def store_research(provider: str, model_name: str, query: str, response: ResearchResponse) -> None:
+    # An empty answer would be served from the cache and recalled by the agent for as long as it lives.
+    if not response.summary.strip() or not response.detailed_report.strip():
+        return
+    key = research_cache_key(provider, model_name, query)
+    for evicted in cache.set("research", key, response.model_dump_json(), RESEARCH_CACHE_MAX_ENTRIES):
+        research_index.remove(evicted)
+    research_index.add(key, normalize_query(query))
+    if response.topic:
+        research_index.add(key, response.topic)
+    data = response.model_dump()
+    research_memory.add(query, data)
+    research_store.append("research", {"provider": provider, "model": model_name, "query": query, "response": data}, topic=query)
+
+
+def lookup_research(
+    provider: str,
+    model_name: str,
+    query: str,
+    max_age: float | None,
+    on_field: Callable[[str, object], None] | None,
+    reuse_similar: bool,
+) -> ResearchResponse | None:
+    cached = cached_research(provider, model_name, query, max_age, on_field)
+    if cached is None and reuse_similar:
+        matches = find_similar_research(query, provider, model_name, limit=1, max_age=max_age)
+        if matches:
+            cached = matches[0][2]
+            replay_fields(cached, on_field)
+    return cached
+
+
+research_flights = SingleFlight()
+
+
+def shared_response(response: ResearchResponse, on_field: Callable[[str, object], None] | None) -> ResearchResponse:
+    response = response.model_copy(deep=True)
+    replay_fields(response, on_field)
+    return response
+
+
+def perform_research(
+    provider: str,
+    api_key: str,
+    model_name: str,
+    query: str,
+    on_token: Callable[[str], None] | None = None,
+    on_field: Callable[[str, object], None] | None = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+    max_age: float | None = None,
+    reuse_similar: bool = False,
+    budget: ResearchBudget | None = None,
+) -> ResearchResponse:
+    with track_run(provider=provider, model=model_name, query=query) as record, research_run(query):
+        if use_cache and not refresh:
+            with span("stage", "cache_lookup"):
+                cached = lookup_research(provider, model_name, query, max_age, on_field, reuse_similar)
+            if cached is not None:
+                record.status = "cached"
+                return cached
+
+        def run() -> ResearchResponse:
+            stream = AnswerStream(on_token, on_field) if on_token or on_field else None
+            response, cacheable = run_research(provider, api_key, model_name, query, stream, budget)
+            if use_cache and cacheable:
+                store_research(provider, model_name, query, response)
+            if not cacheable:
+                record.status = "degraded"
+            return response
+
+        response, shared = research_flights.do(research_cache_key(provider, model_name, query), run)
+        if shared:
+            record.status = "shared"
+            return shared_response(response, on_field)
+        return response
+
+
+async def aperform_research(
+    provider: str,
+    api_key: str,
+    model_name: str,
+    query: str,
+    on_token: Callable[[str], None] | None = None,
+    on_field: Callable[[str, object], None] | None = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+    max_age: float | None = None,
+    reuse_similar: bool = False,
+    budget: ResearchBudget | None = None,
+) -> ResearchResponse:
+    with track_run(provider=provider, model=model_name, query=query) as record, research_run(query):
+        if use_cache and not refresh:
+            with span("stage", "cache_lookup"):
+                # SQLite lookups can wait on a busy lock; keep them off the event loop, then replay on it.
+                cached = await asyncio.to_thread(lookup_research, provider, model_name, query, max_age, None, reuse_similar)
+            if cached is not None:
+                replay_fields(cached, on_field)
+                record.status = "cached"
+                return cached
+
+        async def run() -> ResearchResponse:
+            stream = AnswerStream(on_token, on_field) if on_token or on_field else None
+            response, cacheable = await arun_research(provider, api_key, model_name, query, stream, budget)
+            if use_cache and cacheable:
+                await asyncio.to_thread(store_research, provider, model_name, query, response)
+            if not cacheable:
+                record.status = "degraded"
+            return response
+
+        response, shared = await research_flights.ado(research_cache_key(provider, model_name, query), run)
+        if shared:
+            record.status = "shared"
+            return shared_response(response, on_field)
+        return response
 
 
 def safe_filename(value: str, fallback: str = "research") -> str:
@@ -0,0 +1,115 @@
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Sequence, TypeVar
+
+
+T = TypeVar("T")
+
+HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", "16"))
+
+_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+
+
+def submit(call: Callable[[], T], pool: ThreadPoolExecutor | None = None) -> Future:
+    return (pool or _pool).submit(contextvars.copy_context().run, call)
+
+
+def first_success(
+    attempts: Sequence[Callable[[], T]],
+    hedge_delay: float,
+    stop_on: Callable[[Exception], bool] = lambda exc: False,
+    timeout: float | None = None,
+    pool: ThreadPoolExecutor | None = None,
+) -> T:
+    if not attempts:
+        raise ValueError("No attempts to run.")
+
+    if hedge_delay < 0:
+        last_error: Exception | None = None
+        for attempt in attempts:
+            try:
+                return attempt()
+            except Exception as exc:
+                last_error = exc
+                if stop_on(exc):
+                    break
+        raise last_error
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    pending = {submit(attempts[0], pool)}
+    launched = 1
+    last_error = None
+    while pending:
+        can_hedge = launched < len(attempts) and not (last_error and stop_on(last_error))
+        wait_for = hedge_delay if can_hedge else None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                for other in pending:
+                    other.cancel()
+                raise TimeoutError(f"No attempt finished within {timeout:g}s.")
+            wait_for = remaining if wait_for is None else min(wait_for, remaining)
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as exc:
+                last_error = exc
+                continue
+            # Running threads cannot be interrupted; the losing result is discarded.
+            for other in pending:
+                other.cancel()
+            return result
+        if deadline is not None and not done and time.monotonic() >= deadline:
+            continue
+        if can_hedge and (not done or not pending) and not (last_error and stop_on(last_error)):
+            pending.add(submit(attempts[launched], pool))
+            launched += 1
+    raise last_error
+
+
+async def afirst_success(
+    attempts: Sequence[Callable[[], Awaitable[T]]],
+    hedge_delay: float,
+    stop_on: Callable[[Exception], bool] = lambda exc: False,
+) -> T:
+    if not attempts:
+        raise ValueError("No attempts to run.")
+
+    if hedge_delay < 0:
+        last_error: Exception | None = None
+        for attempt in attempts:
+            try:
+                return await attempt()
+            except Exception as exc:
+                last_error = exc
+                if stop_on(exc):
+                    break
+        raise last_error
+
+    pending = {asyncio.ensure_future(attempts[0]())}
+    launched = 1
+    last_error = None
+    try:
+        while pending:
+            can_hedge = launched < len(attempts) and not (last_error and stop_on(last_error))
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=hedge_delay if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                try:
+                    return task.result()
+                except Exception as exc:
+                    last_error = exc
+            if can_hedge and (not done or not pending) and not (last_error and stop_on(last_error)):
+                pending.add(asyncio.ensure_future(attempts[launched]()))
+                launched += 1
+    finally:
+        for task in pending:
+            task.cancel()
+    raise last_error
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from core import ResearchResponse, perform_research
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "100"))
+JOB_TTL = float(os.getenv("JOB_TTL", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "error"
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+class Job:
+    def __init__(self, provider: str, model: str, query: str):
+        self.id = uuid.uuid4().hex
+        self.provider = provider
+        self.model = model
+        self.query = query
+        self.status = QUEUED
+        self.result: ResearchResponse | None = None
+        self.error = ""
+        self.tokens: list[str] = []
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def update(self, **changes) -> None:
+        with self._changed:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self._changed.notify_all()
+
+    def add_token(self, token: str) -> None:
+        with self._changed:
+            self.tokens.append(token)
+            self._changed.notify_all()
+
+    def wait(self, timeout: float) -> bool:
+        with self._changed:
+            return self._changed.wait_for(lambda: self.finished, timeout)
+
+    def tokens_since(self, offset: int, timeout: float) -> tuple[list[str], bool]:
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.tokens) > offset or self.finished, timeout)
+            return self.tokens[offset:], self.finished
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "provider": self.provider,
+            "model": self.model,
+            "query": self.query,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result:
+            data["result"] = self.result.model_dump() if self.result else None
+            data["error"] = self.error or None
+        return data
+
+
+class JobQueue:
+    def __init__(self, workers: int = JOB_WORKERS, limit: int = JOB_QUEUE_LIMIT, ttl: float = JOB_TTL):
+        self.limit = limit
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="research-job")
+
+    def submit(self, provider: str, api_key: str, model: str, query: str, refresh: bool = False) -> Job:
+        job = Job(provider, model, query)
+        with self._lock:
+            self._expire()
+            pending = sum(1 for item in self._jobs.values() if not item.finished)
+            if pending >= self.limit:
+                raise JobQueueFull(f"{pending} research jobs are already queued. Try again shortly.")
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, api_key, refresh)
+        return job
+
+    def _run(self, job: Job, api_key: str, refresh: bool) -> None:
+        job.update(status=RUNNING, started_at=time.time())
+        try:
+            result = perform_research(
+                job.provider,
+                api_key,
+                job.model,
+                job.query,
+                on_token=job.add_token,
+                refresh=refresh,
+            )
+        except Exception as exc:
+            job.update(status=FAILED, error=str(exc) or type(exc).__name__, finished_at=time.time())
+        else:
+            job.update(status=DONE, result=result, finished_at=time.time())
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        with self._lock:
+            self._expire()
+            return list(reversed(self._jobs.values()))
@@ -0,0 +1,212 @@
+import json
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+
+
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+JSON_LITERALS = {"true", "false", "null"}
+_BARE_WORD = re.compile(r"[A-Za-z0-9_.+\-]+")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$")
+_FENCE = re.compile(r"^\s*(?:```(?:json)?)?\s*$", re.IGNORECASE)
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+@dataclass
+class RepairResult:
+    data: dict
+    repairs: list[str] = field(default_factory=list)
+
+
+class RepairStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def record(self, stage: str, result: RepairResult | None) -> None:
+        with self._lock:
+            self._counts[f"{stage}:attempts"] += 1
+            if result is None:
+                self._counts[f"{stage}:failed"] += 1
+                return
+            self._counts[f"{stage}:repaired"] += 1
+            # Only a repaired final answer replaces a model call; a repaired normalize reply was already paid for.
+            if stage == "final_answer":
+                self._counts[f"{stage}:skipped_calls"] += 1
+            for repair in result.repairs:
+                self._counts[f"{stage}:repair:{repair}"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+
+repair_stats = RepairStats()
+
+
+def _scan(text: str) -> tuple[str, list[str]]:
+    repairs: list[str] = []
+
+    def note(name: str) -> None:
+        if name not in repairs:
+            repairs.append(name)
+
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("No JSON object found in the model response.")
+    if not _FENCE.match(text[:start]):
+        note("leading_text")
+
+    out: list[str] = []
+    stack: list[str] = []
+    prev = ""
+    in_string = False
+    quote = '"'
+    escape = False
+    last_comma = -1
+    key_cut: int | None = None
+    dangling_from: int | None = None
+    index = start
+    length = len(text)
+
+    while index < length:
+        char = text[index]
+
+        if in_string:
+            if escape:
+                out.append(char)
+                escape = False
+            elif char == "\\":
+                out.append(char)
+                escape = True
+            elif char == quote:
+                out.append('"')
+                in_string = False
+                prev = "v"
+            elif char == '"':
+                out.append('\\"')
+            elif char in _CONTROL_ESCAPES:
+                out.append(_CONTROL_ESCAPES[char])
+                note("control_characters")
+            elif ord(char) < 0x20:
+                out.append(f"\\u{ord(char):04x}")
+                note("control_characters")
+            else:
+                out.append(char)
+            index += 1
+            continue
+
+        if char.isspace():
+            out.append(char)
+        elif char in "\"'":
+            if prev == "v":
+                key_cut = last_comma = len(out)
+                out.append(",")
+                note("missing_commas")
+                prev = ","
+            if char == "'":
+                note("single_quotes")
+            if stack and stack[-1] == "{" and prev in "{,":
+                dangling_from = key_cut if prev == "," else len(out)
+            else:
+                dangling_from = None
+            in_string = True
+            quote = char
+            out.append('"')
+        elif char in "{[":
+            if prev == "v":
+                out.append(",")
+                note("missing_commas")
+            dangling_from = None
+            stack.append(char)
+            out.append(char)
+            prev = char
+        elif char in "}]":
+            if not stack:
+                break
+            if prev == ",":
+                del out[last_comma]
+                note("trailing_commas")
+            expected = "}" if stack.pop() == "{" else "]"
+            if char != expected:
+                note("mismatched_brackets")
+            out.append(expected)
+            prev = "v"
+            dangling_from = None
+            if not stack:
+                index += 1
+                break
+        elif char == ",":
+            if prev in ",{[":
+                note("trailing_commas")
+            else:
+                key_cut = last_comma = len(out)
+                out.append(",")
+                prev = ","
+        elif char == ":":
+            out.append(char)
+            prev = ":"
+        else:
+            match = _BARE_WORD.match(text, index)
+            if not match:
+                index += 1
+                continue
+            word = match.group()
+            if prev == "v":
+                key_cut = last_comma = len(out)
+                out.append(",")
+                note("missing_commas")
+                prev = ","
+            if word in PYTHON_LITERALS:
+                word = PYTHON_LITERALS[word]
+                note("python_literals")
+            elif word not in JSON_LITERALS and not _NUMBER.match(word):
+                if stack and stack[-1] == "{" and prev in "{,":
+                    dangling_from = key_cut if prev == "," else len(out)
+                word = json.dumps(word)
+                note("bare_words")
+            if prev == ":":
+                dangling_from = None
+            out.append(word)
+            prev = "v"
+            index = match.end()
+            continue
+        index += 1
+
+    if stack or in_string:
+        note("truncated_output")
+        if in_string:
+            if escape:
+                out.pop()
+            out.append('"')
+            prev = "v"
+        if prev == ":" and dangling_from is None:
+            dangling_from = key_cut
+        if dangling_from is not None and (prev == ":" or _dangling_key(out, dangling_from)):
+            del out[dangling_from:]
+        while out and out[-1].isspace():
+            out.pop()
+        if out and out[-1] == ",":
+            out.pop()
+        out.extend("}" if opener == "{" else "]" for opener in reversed(stack))
+    elif text[index:].strip() and not _FENCE.match(text[index:]):
+        note("trailing_text")
+
+    return "".join(out), repairs
+
+
+def _dangling_key(out: list[str], start: int) -> bool:
+    tail = "".join(out[start:]).lstrip(", \t\r\n")
+    return ":" not in tail
+
+
+def repair_json(text: str) -> RepairResult:
+    repaired, repairs = _scan(text)
+    try:
+        data = json.loads(repaired)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"JSON repair failed: {exc}") from exc
+    if not isinstance(data, dict):
+        raise ValueError("Repaired JSON is not an object.")
+    return RepairResult(data, repairs)
@@ -0,0 +1,122 @@
+import json
+import re
+from typing import Callable
+
+
+_STRUCTURAL = re.compile(r'[{}\[\],"\\]')
+_DECODER = json.JSONDecoder()
+
+
+class IncrementalJSONParser:
+    def __init__(self, on_field: Callable[[str, object], None] | None = None):
+        self.on_field = on_field
+        self.fields: dict = {}
+        self.start = -1
+        self.end = -1
+        self.done = False
+        self.failed = False
+        self._consumed = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._segment: list[str] = []
+
+    def feed(self, chunk: str) -> list[tuple[str, object]]:
+        emitted: list[tuple[str, object]] = []
+        if self.done or not chunk:
+            return emitted
+
+        index = skip_to = 0
+        if self._depth == 0:
+            index = chunk.find("{")
+            if index < 0:
+                self._consumed += len(chunk)
+                return emitted
+            self.start = self._consumed + index
+            self._depth = 1
+            index = skip_to = index + 1
+        elif self._escape:
+            # The previous chunk ended on a backslash, so this chunk's first character is escaped.
+            self._escape = False
+            skip_to = 1
+
+        segment_start = index
+        for match in _STRUCTURAL.finditer(chunk, index):
+            position = match.start()
+            if position < skip_to:
+                continue
+            char = match.group()
+
+            if self._in_string:
+                if char == "\\":
+                    if position + 1 < len(chunk):
+                        skip_to = position + 2
+                    else:
+                        self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_field(chunk[segment_start:position], emitted)
+                    self.end = self._consumed + position
+                    self.done = True
+                    self._consumed += len(chunk)
+                    return emitted
+            elif char == "," and self._depth == 1:
+                self._finish_field(chunk[segment_start:position], emitted)
+                segment_start = position + 1
+
+        self._segment.append(chunk[segment_start:])
+        self._consumed += len(chunk)
+        return emitted
+
+    def _finish_field(self, tail: str, emitted: list[tuple[str, object]]) -> None:
+        self._segment.append(tail)
+        text = "".join(self._segment)
+        self._segment = []
+        if not text.strip():
+            return
+        try:
+            field = json.loads("{" + text + "}")
+        except json.JSONDecodeError:
+            self.failed = True
+            return
+        for name, value in field.items():
+            self.fields[name] = value
+            emitted.append((name, value))
+            if self.on_field:
+                self.on_field(name, value)
+
+
+def opens_array(text: str, start: int) -> bool:
+    # An object whose "{" directly follows "[" sits in a top-level array, such as a list of search results.
+    bracket = text.rfind("[", 0, start)
+    return bracket >= 0 and not text[bracket + 1 : start].strip()
+
+
+def find_json_object(text: str) -> dict:
+    offset = 0
+    while True:
+        parser = IncrementalJSONParser()
+        parser.feed(text[offset:] if offset else text)
+        if parser.start < 0:
+            raise ValueError("No JSON object found in the model response.")
+        if not parser.done:
+            raise ValueError("The JSON object in the model response is not closed.")
+        start = offset + parser.start
+        if opens_array(text, start):
+            try:
+                offset = _DECODER.raw_decode(text, text.rfind("[", 0, start))[1]
+            except json.JSONDecodeError:
+                offset = offset + parser.end + 1
+            continue
+        if not parser.failed:
+            return parser.fields
+        offset += parser.end + 1
@@ -1,3 +1,7 @@
+import argparse
+import asyncio
+from pathlib import Path
+
 from dotenv import load_dotenv
 
 from core import (
@@ -49,7 +53,83 @@ def select_model(provider: str) -> str:
     return custom or model_id or get_default_model(provider)
 
 
+def print_token(token: str) -> None:
+    print(token, end="", flush=True)
+
+
+def resolve_provider(value: str) -> str:
+    for provider in PROVIDERS:
+        if value.strip().lower() in {provider.lower(), provider.lower().replace(" ", "")}:
+            return provider
+    raise argparse.ArgumentTypeError(f"Unknown provider {value!r}. Choose from: {', '.join(PROVIDERS)}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AI Research Assistant command line.")
+    parser.add_argument("--batch", metavar="FILE", help="Run queries from a JSONL or CSV file non-interactively. Use - for stdin.")
+    parser.add_argument("--provider", type=resolve_provider, default=PROVIDER_NVIDIA_NIM, help="Provider for batch mode.")
+    parser.add_argument("--model", help="Model ID for batch mode. Defaults to the provider's first model.")
+    parser.add_argument("--output", help="JSONL file that receives one result per line.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum queries researched at once.")
+    parser.add_argument("--no-resume", action="store_true", help="Rerun items that already succeeded in the output file.")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached results and store fresh ones.")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the result cache.")
+    return parser.parse_args(argv)
+
+
+def run_batch_mode(args: argparse.Namespace) -> None:
+    from batch import default_output_path, read_items, run_batch
+
+    provider = args.provider
+    api_key = get_api_key(provider)
+    if not api_key:
+        print(f"Missing {PROVIDER_ENV_KEYS[provider]}. Add it to .env first.")
+        raise SystemExit(1)
+
+    model_name = args.model or get_default_model(provider)
+    output_path = Path(args.output) if args.output else default_output_path(args.batch)
+    items = read_items(args.batch)
+    if not items:
+        print("No queries found in the batch input.")
+        raise SystemExit(1)
+
+    print(f"Researching {len(items)} queries with {provider} / {model_name} (concurrency {args.concurrency})")
+
+    def report(record: dict) -> None:
+        status = "ok" if record["status"] == "ok" else f"error: {record.get('error', '')[:120]}"
+        print(f"  [{record['elapsed_seconds']:>7.1f}s] {record['id']} {status}")
+
+    summary = asyncio.run(
+        run_batch(
+            items,
+            provider,
+            api_key,
+            model_name,
+            output_path,
+            concurrency=args.concurrency,
+            resume=not args.no_resume,
+            on_record=report,
+            use_cache=not args.no_cache,
+            refresh=args.refresh,
+        )
+    )
+
+    print("=" * 72)
+    print("BATCH COMPLETE")
+    print("=" * 72)
+    for key, value in summary.items():
+        print(f"{key.replace('_', ' ').capitalize()}: {value}")
+    if summary["failed"]:
+        print("Rerun the same command to retry failed items.")
+        raise SystemExit(2)
+
+
 def main() -> None:
+    args = parse_args()
+    if args.batch:
+        run_batch_mode(args)
+        return
+
     print("=" * 72)
     print("AI Research Assistant - Command Line")
     print("=" * 72)
@@ -74,8 +154,18 @@ def main() -> None:
     print("\nResearching...\n")
 
     try:
-        result = perform_research(provider, api_key, model_name, query)
+        result = perform_research(
+            provider,
+            api_key,
+            model_name,
+            query,
+            on_token=print_token,
+            use_cache=not args.no_cache,
+            refresh=args.refresh,
+        )
+        print()
     except Exception as exc:
+        print()
         message = str(exc)
         print(f"Research failed: {message}")
         if "429" in message:
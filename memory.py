@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from cache import CACHE_PATH, normalize_query, transaction
+
+
+MEMORY_ENABLED = os.getenv("RESEARCH_MEMORY", "1").strip().lower() not in {"0", "false", "no", "off"}
+MEMORY_PATH = Path(os.getenv("RESEARCH_MEMORY_PATH", "") or CACHE_PATH)
+MEMORY_MAX_ENTRIES = int(os.getenv("RESEARCH_MEMORY_MAX_ENTRIES", "5000"))
+MEMORY_RESULTS = int(os.getenv("RESEARCH_MEMORY_RESULTS", "3"))
+MEMORY_MAX_CHARS = int(os.getenv("RESEARCH_MEMORY_MAX_CHARS", "4000"))
+
+# bm25 weights for query, topic, summary, key_findings, detailed_report, sources.
+COLUMN_WEIGHTS = (5.0, 4.0, 2.0, 2.0, 1.0, 0.5)
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+STOP_WORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me of on or should the to was what when where which who why will with".split()
+)
+
+
+def match_expression(text: str) -> str:
+    words = []
+    for word in WORD_PATTERN.findall(text.casefold()):
+        if word not in STOP_WORDS and word not in words:
+            words.append(word)
+    # Quoted terms keep FTS5 operators and punctuation in the question from being parsed as syntax.
+    return " OR ".join(f'"{word}"' for word in words[:32])
+
+
+class ResearchMemory:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS research_memory USING fts5(
+                    query, topic, summary, key_findings, detailed_report, sources,
+                    key UNINDEXED, created_at UNINDEXED, payload UNINDEXED,
+                    tokenize = 'porter unicode61 remove_diacritics 2'
+                )
+                """
+            )
+            self._local.conn = conn
+        return conn
+
+    def add(self, query: str, data: dict) -> None:
+        if not MEMORY_ENABLED:
+            return
+        key = normalize_query(query)
+        try:
+            conn = self.connect()
+            with transaction(conn):
+                conn.execute("DELETE FROM research_memory WHERE key = ?", (key,))
+                conn.execute(
+                    "INSERT INTO research_memory VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        query,
+                        data.get("topic", ""),
+                        data.get("summary", ""),
+                        "\n".join(data.get("key_findings", [])),
+                        data.get("detailed_report", ""),
+                        "\n".join([*data.get("sources", []), *data.get("source_links", [])]),
+                        key,
+                        time.time(),
+                        json.dumps(data, ensure_ascii=False),
+                    ),
+                )
+                conn.execute(
+                    """
+                    DELETE FROM research_memory WHERE rowid IN (
+                        SELECT rowid FROM research_memory ORDER BY rowid DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (MEMORY_MAX_ENTRIES,),
+                )
+        except sqlite3.Error:
+            pass
+
+    def search(self, text: str, limit: int = MEMORY_RESULTS) -> list[tuple[str, float, dict]]:
+        expression = match_expression(text)
+        if not MEMORY_ENABLED or not expression:
+            return []
+        try:
+            rows = self.connect().execute(
+                f"""
+                SELECT query, created_at, payload FROM research_memory
+                WHERE research_memory MATCH ?
+                ORDER BY bm25(research_memory, {", ".join(map(str, COLUMN_WEIGHTS))})
+                LIMIT ?
+                """,
+                (expression, limit),
+            ).fetchall()
+        except sqlite3.Error:
+            return []
+        return [(query, created_at, json.loads(payload)) for query, created_at, payload in rows]
+
+    def clear(self) -> None:
+        try:
+            self.connect().execute("DELETE FROM research_memory")
+        except sqlite3.Error:
+            pass
+
+
+research_memory = ResearchMemory(MEMORY_PATH)
+
+
+def render_memory(query: str, created_at: float, data: dict, max_chars: int) -> str:
+    researched = datetime.fromtimestamp(created_at).strftime("%Y-%m-%d")
+    lines = [f"## {data.get('topic') or query}", f"Question: {query} (researched {researched})", "", data.get("summary", "")]
+    if data.get("key_findings"):
+        lines += ["", "Key findings:", *(f"- {finding}" for finding in data["key_findings"])]
+    if data.get("source_links"):
+        lines += ["", "Sources:", *data["source_links"][:8]]
+    text = "\n".join(lines)
+    if len(text) < max_chars and data.get("detailed_report"):
+        text += "\n\nReport excerpt:\n" + data["detailed_report"][: max_chars - len(text) - 20]
+    return text[:max_chars]
+
+
+def recall(text: str) -> str:
+    matches = research_memory.search(text)
+    if not matches:
+        return f"No earlier research matches {text!r}. Use web search or Wikipedia."
+    share = MEMORY_MAX_CHARS // len(matches)
+    return "\n\n".join(render_memory(query, created_at, data, share) for query, created_at, data in matches)
@@ -0,0 +1,233 @@
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+
+METRICS_ENABLED = os.getenv("RESEARCH_METRICS", "1").strip().lower() not in {"0", "false", "no", "off"}
+RECENT_RUNS = int(os.getenv("METRICS_RECENT_RUNS", "50"))
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+@dataclass
+class Span:
+    kind: str
+    name: str
+    status: str
+    start: float
+    duration: float
+    attributes: dict = field(default_factory=dict)
+
+
+class RunRecord:
+    def __init__(self, attributes: dict):
+        self.id = uuid.uuid4().hex
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.status = "ok"
+        self.duration = 0.0
+        self.spans: list[Span] = []
+        self.tokens: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+            for name in ("input_tokens", "output_tokens"):
+                if span.attributes.get(name):
+                    self.tokens[name] += span.attributes[name]
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+            tokens = dict(self.tokens)
+        totals: Counter = Counter()
+        for span in spans:
+            totals[f"{span.kind}:{span.name}"] += span.duration
+        return {
+            "id": self.id,
+            "started_at": self.started_at,
+            "status": self.status,
+            "duration": round(self.duration, 4),
+            **self.attributes,
+            "tokens": tokens,
+            "seconds_by_span": {name: round(value, 4) for name, value in totals.most_common()},
+            "spans": [
+                {
+                    "kind": span.kind,
+                    "name": span.name,
+                    "status": span.status,
+                    "offset": round(span.start - self.started_at, 4),
+                    "duration": round(span.duration, 4),
+                    **span.attributes,
+                }
+                for span in spans
+            ],
+        }
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple[str, str, str], list] = {}
+        self._tokens: Counter = Counter()
+        self._runs: deque[RunRecord] = deque(maxlen=RECENT_RUNS)
+
+    def observe(self, kind: str, name: str, status: str, seconds: float, attributes: dict) -> None:
+        with self._lock:
+            histogram = self._histograms.get((kind, name, status))
+            if histogram is None:
+                histogram = self._histograms[(kind, name, status)] = [[0] * (len(BUCKETS) + 1), 0.0]
+            histogram[0][bisect_left(BUCKETS, seconds)] += 1
+            histogram[1] += seconds
+            if kind == "llm":
+                for direction in ("input", "output"):
+                    if attributes.get(f"{direction}_tokens"):
+                        self._tokens[(name, direction)] += attributes[f"{direction}_tokens"]
+
+    def add_run(self, record: RunRecord) -> None:
+        with self._lock:
+            self._runs.append(record)
+
+    def recent_runs(self) -> list[RunRecord]:
+        with self._lock:
+            return list(reversed(self._runs))
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = {key: (list(counts), total) for key, (counts, total) in self._histograms.items()}
+            tokens = dict(self._tokens)
+
+        lines = [
+            "# HELP research_span_seconds Time spent in research runs, stages, model calls, and tool calls.",
+            "# TYPE research_span_seconds histogram",
+        ]
+        for (kind, name, status), (counts, total) in sorted(histograms.items()):
+            labels = f'kind="{escape(kind)}",name="{escape(name)}",status="{escape(status)}"'
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'research_span_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"research_span_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"research_span_seconds_count{{{labels}}} {cumulative}")
+
+        lines.append("# HELP research_llm_tokens_total Model tokens reported by the provider.")
+        lines.append("# TYPE research_llm_tokens_total counter")
+        for (model, direction), value in sorted(tokens.items()):
+            lines.append(f'research_llm_tokens_total{{model="{escape(model)}",direction="{direction}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+_current_run: ContextVar[RunRecord | None] = ContextVar("research_run", default=None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+    def set(self, **attributes) -> None:
+        return None
+
+    def mark(self, status: str) -> None:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanTimer:
+    __slots__ = ("kind", "name", "status", "attributes", "_start", "_wall_start")
+
+    def __init__(self, kind: str, name: str, attributes: dict):
+        self.kind = kind
+        self.name = name
+        self.status = "ok"
+        self.attributes = attributes
+
+    def __enter__(self) -> "SpanTimer":
+        self._wall_start = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        duration = time.perf_counter() - self._start
+        if exc_type is not None and self.status == "ok":
+            self.status = "closed" if issubclass(exc_type, GeneratorExit) else "error"
+        registry.observe(self.kind, self.name, self.status, duration, self.attributes)
+        run = _current_run.get()
+        if run is not None:
+            run.add(Span(self.kind, self.name, self.status, self._wall_start, duration, self.attributes))
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def mark(self, status: str) -> None:
+        self.status = status
+
+
+def span(kind: str, name: str, **attributes) -> SpanTimer | _NoopSpan:
+    if not METRICS_ENABLED:
+        return NOOP_SPAN
+    return SpanTimer(kind, name, attributes)
+
+
+class RunTimer:
+    def __init__(self, attributes: dict):
+        self.record = RunRecord(attributes)
+        self._token = None
+        self._start = 0.0
+
+    def __enter__(self) -> RunRecord:
+        self._token = _current_run.set(self.record)
+        self._start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        record = self.record
+        record.duration = time.perf_counter() - self._start
+        _current_run.reset(self._token)
+        if exc_type is not None and record.status == "ok":
+            record.status = "error"
+        registry.observe("run", "research", record.status, record.duration, {})
+        registry.add_run(record)
+
+
+class _NoopRun:
+    __slots__ = ()
+    status = "ok"
+
+    def __enter__(self) -> "_NoopRun":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+    def __setattr__(self, name: str, value: object) -> None:
+        return None
+
+
+NOOP_RUN = _NoopRun()
+
+
+def track_run(**attributes) -> RunTimer | _NoopRun:
+    if not METRICS_ENABLED:
+        return NOOP_RUN
+    return RunTimer(attributes)
+
+
+def current_run() -> RunRecord | None:
+    return _current_run.get()
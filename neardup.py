@@ -0,0 +1,139 @@
+import hashlib
+import os
+import random
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Iterable
+
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.6"))
+_PRIME = (1 << 61) - 1
+_random = random.Random(1729)
+_PERMUTATIONS = [(_random.randrange(1, _PRIME), _random.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+STOPWORDS = frozenset(
+    """
+    a about above after all also an and any are as at be been being between both but by can could did do does
+    for from had has have how i if in into is it its latest me more most my new of on or our recent research
+    should so some such tell than that the their them then there these they this those to up use used uses
+    using via was what when where which who why will with within would you your
+    """.split()
+)
+_SUFFIXES = ("ations", "ation", "ings", "ing", "ers", "er", "ies", "es", "ed", "ly", "s")
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[: -len(suffix)]
+    return word
+
+
+def shingles(text: str) -> frozenset[str]:
+    words = re.findall(r"[a-z0-9]+", text.casefold())
+    return frozenset(stem(word) for word in words if word not in STOPWORDS)
+
+
+@lru_cache(maxsize=65536)
+def permuted_hashes(shingle: str) -> tuple[int, ...]:
+    value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "big")
+    return tuple((a * value + b) % _PRIME for a, b in _PERMUTATIONS)
+
+
+def minhash(tokens: Iterable[str]) -> tuple[int, ...]:
+    rows = [permuted_hashes(token) for token in tokens]
+    if not rows:
+        return ()
+    return tuple(map(min, zip(*rows)))
+
+
+def jaccard(left: frozenset[str], right: frozenset[str]) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+class NearDuplicateIndex:
+    def __init__(self, loader: Callable[[], Iterable[tuple[str, str]]] | None = None, max_keys: int | None = None):
+        self._loader = loader
+        self._loaded = loader is None
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+        self._keys: OrderedDict[str, dict[tuple[str, str], tuple[int, ...]]] = OrderedDict()
+        self._tokens: dict[tuple[str, str], frozenset[str]] = {}
+        self._buckets: dict[tuple[int, tuple[int, ...]], set[tuple[str, str]]] = {}
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        # Queries wait for the first load instead of matching against a half-built index.
+        with self._load_lock:
+            if self._loaded:
+                return
+            for key, text in self._loader():
+                self.add(key, text)
+            self._loaded = True
+
+    def add(self, key: str, text: str) -> None:
+        tokens = shingles(text)
+        signature = minhash(tokens)
+        if not signature:
+            return
+        entry = (key, text)
+        with self._lock:
+            entries = self._keys.setdefault(key, {})
+            self._keys.move_to_end(key)
+            if entry not in self._tokens:
+                entries[entry] = signature
+                self._tokens[entry] = tokens
+                for band in range(BANDS):
+                    bucket = (band, signature[band * ROWS : (band + 1) * ROWS])
+                    self._buckets.setdefault(bucket, set()).add(entry)
+            while self.max_keys and len(self._keys) > self.max_keys:
+                self._discard(next(iter(self._keys)))
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key: str) -> None:
+        for entry, signature in self._keys.pop(key, {}).items():
+            del self._tokens[entry]
+            for band in range(BANDS):
+                bucket = (band, signature[band * ROWS : (band + 1) * ROWS])
+                members = self._buckets.get(bucket)
+                if members is not None:
+                    members.discard(entry)
+                    if not members:
+                        del self._buckets[bucket]
+
+    def query(self, text: str, threshold: float | None = None, limit: int = 5) -> list[tuple[float, str]]:
+        self._ensure_loaded()
+        threshold = NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+        tokens = shingles(text)
+        signature = minhash(tokens)
+        if not signature:
+            return []
+
+        with self._lock:
+            candidates: set[tuple[str, str]] = set()
+            for band in range(BANDS):
+                candidates.update(self._buckets.get((band, signature[band * ROWS : (band + 1) * ROWS]), ()))
+            scored = [(jaccard(tokens, self._tokens[entry]), entry[0]) for entry in candidates]
+
+        best: dict[str, float] = {}
+        for score, key in scored:
+            if score >= threshold and score > best.get(key, -1.0):
+                best[key] = score
+        return sorted(((score, key) for key, score in best.items()), reverse=True)[:limit]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tokens)
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import json
+import os
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from cache import cache
+
+if TYPE_CHECKING:
+    import httpx
+
+
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", "2000000"))
+FETCH_MAX_CHARS = int(os.getenv("FETCH_MAX_CHARS", "6000"))
+FETCH_MAX_URLS = int(os.getenv("FETCH_MAX_URLS", "4"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "15"))
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8"))
+FETCH_CACHE_FRESH = float(os.getenv("FETCH_CACHE_FRESH", "900"))
+FETCH_CACHE_MAX_ENTRIES = int(os.getenv("FETCH_CACHE_MAX_ENTRIES", "1000"))
+USER_AGENT = os.getenv("FETCH_USER_AGENT", "Mozilla/5.0 (compatible; AI-Research-Assistant/1.0)")
+
+TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain", "text/markdown", "application/json", "application/xml", "text/xml")
+DROP_TAGS = ("script", "style", "noscript", "template", "svg", "canvas", "iframe", "form", "nav", "header", "footer", "aside")
+URL_PATTERN = re.compile(r"https?://[^\s,<>\"']+")
+
+_client_lock = threading.Lock()
+_client: httpx.Client | None = None
+_fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+
+
+class FetchError(RuntimeError):
+    pass
+
+
+@dataclass
+class Page:
+    url: str
+    title: str
+    text: str
+    status: str
+    truncated: bool = False
+
+    def render(self, max_chars: int = FETCH_MAX_CHARS) -> str:
+        text = self.text
+        if len(text) > max_chars:
+            text = text[:max_chars].rsplit(" ", 1)[0] + " [...]"
+        note = " (download truncated)" if self.truncated else ""
+        return f"## {self.title or self.url}\nURL: {self.url}{note}\n\n{text}"
+
+
+def public_addresses(host: str, port: int) -> list[str]:
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise FetchError(f"could not resolve {host}: {exc}") from exc
+    addresses = []
+    for *_, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        # One non-public answer rejects the host, so a name cannot mix a public and an internal address.
+        if not address.is_global:
+            raise FetchError(f"{host} resolves to a private or loopback address")
+        if str(address) not in addresses:
+            addresses.append(str(address))
+    return addresses
+
+
+def public_transport(**kwargs) -> httpx.HTTPTransport:
+    import httpcore
+    import httpx
+
+    class PublicOnlyBackend(httpcore.NetworkBackend):
+        def __init__(self, backend: httpcore.NetworkBackend):
+            self._backend = backend
+
+        def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+            # Connect to the address that was checked, so DNS rebinding cannot swap in an internal one.
+            error: Exception | None = None
+            for address in public_addresses(host, port):
+                try:
+                    return self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+                except httpcore.ConnectError as exc:
+                    error = exc
+            raise error
+
+        def connect_unix_socket(self, path, timeout=None, socket_options=None):
+            raise FetchError("unix sockets cannot be fetched")
+
+        def sleep(self, seconds: float) -> None:
+            self._backend.sleep(seconds)
+
+    transport = httpx.HTTPTransport(**kwargs)
+    # httpx has no public hook for name resolution; every connection the pool opens goes through this backend.
+    transport._pool._network_backend = PublicOnlyBackend(transport._pool._network_backend)
+    return transport
+
+
+def get_client() -> httpx.Client:
+    global _client
+    import httpx
+
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(
+                transport=public_transport(
+                    limits=httpx.Limits(max_connections=50, max_keepalive_connections=FETCH_WORKERS * 2, keepalive_expiry=30),
+                ),
+                # Proxies from the environment would connect on our behalf and skip the address check.
+                trust_env=False,
+                follow_redirects=True,
+                max_redirects=5,
+                headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.5"},
+                timeout=httpx.Timeout(FETCH_TIMEOUT, connect=min(FETCH_TIMEOUT, 5.0)),
+                # Redirect targets are checked too, so a public URL cannot bounce the fetch to a local address.
+                event_hooks={"request": [lambda request: check_url(str(request.url))]},
+            )
+        return _client
+
+
+def parse_urls(text: str) -> list[str]:
+    urls = []
+    for url in URL_PATTERN.findall(text):
+        url = url.rstrip(".);]")
+        if url not in urls:
+            urls.append(url)
+    return urls[:FETCH_MAX_URLS]
+
+
+def check_url(url: str) -> None:
+    parts = urlsplit(url)
+    if parts.scheme not in {"http", "https"} or not parts.hostname:
+        raise FetchError("only http and https URLs can be fetched")
+    host = parts.hostname.lower()
+    if host == "localhost" or host.endswith(".localhost") or host.endswith(".local"):
+        raise FetchError("local addresses cannot be fetched")
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return
+    if not address.is_global:
+        raise FetchError("private and loopback addresses cannot be fetched")
+
+
+def extract_text(body: bytes, content_type: str, encoding: str | None) -> tuple[str, str]:
+    if "html" not in content_type and "xml" not in content_type:
+        text = body.decode(encoding or "utf-8", errors="replace")
+        return "", re.sub(r"\n{3,}", "\n\n", text).strip()
+
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(body, "lxml", from_encoding=encoding)
+    title = soup.title.get_text(" ", strip=True) if soup.title else ""
+    for tag in soup(DROP_TAGS):
+        tag.decompose()
+    root = soup.find("article") or soup.find("main") or soup.body or soup
+    lines = (re.sub(r"[ \t\xa0]+", " ", line).strip() for line in root.get_text("\n").splitlines())
+    return title, "\n".join(line for line in lines if line)
+
+
+def read_capped(response: httpx.Response, limit: int, deadline: float) -> tuple[bytes, bool]:
+    chunks = []
+    size = 0
+    for chunk in response.iter_bytes():
+        # The client timeout applies per read, so a server trickling bytes needs an overall deadline.
+        if time.monotonic() > deadline:
+            raise FetchError(f"page took longer than {FETCH_TIMEOUT:g}s to download")
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            return b"".join(chunks)[:limit], True
+    return b"".join(chunks), False
+
+
+def cached_page(url: str) -> dict | None:
+    raw = cache.get("page", url)
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+
+
+def store_page(url: str, entry: dict) -> None:
+    cache.set("page", url, json.dumps(entry, ensure_ascii=False), FETCH_CACHE_MAX_ENTRIES)
+
+
+def fetch_page(url: str) -> Page:
+    check_url(url)
+    entry = cached_page(url)
+    if entry and time.time() - entry["fetched_at"] < FETCH_CACHE_FRESH:
+        return Page(url, entry["title"], entry["text"], "cached", entry.get("truncated", False))
+
+    deadline = time.monotonic() + FETCH_TIMEOUT
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    with get_client().stream("GET", url, headers=headers) as response:
+        if response.status_code == 304 and entry:
+            entry["fetched_at"] = time.time()
+            store_page(url, entry)
+            return Page(url, entry["title"], entry["text"], "revalidated", entry.get("truncated", False))
+        if response.status_code >= 400:
+            raise FetchError(f"HTTP {response.status_code}")
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type and not content_type.startswith(TEXT_TYPES):
+            raise FetchError(f"unsupported content type {content_type}")
+        body, truncated = read_capped(response, FETCH_MAX_BYTES, deadline)
+        title, text = extract_text(body, content_type, response.charset_encoding)
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+
+    if not text:
+        raise FetchError("no readable text on the page")
+    store_page(
+        url,
+        {
+            "title": title,
+            "text": text,
+            "truncated": truncated,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        },
+    )
+    return Page(url, title, text, "fetched", truncated)
+
+
+def describe_failure(url: str, exc: Exception) -> str:
+    return f"## {url}\nCould not fetch this page: {str(exc) or type(exc).__name__}"
+
+
+def fetch_pages(urls: list[str]) -> list[Page | Exception]:
+    def attempt(url: str) -> Page | Exception:
+        try:
+            return fetch_page(url)
+        except Exception as exc:
+            return exc
+
+    if len(urls) == 1:
+        return [attempt(urls[0])]
+    return list(_fetch_pool.map(attempt, urls))
+
+
+async def afetch_pages(urls: list[str]) -> list[Page | Exception]:
+    loop = asyncio.get_running_loop()
+    tasks = [loop.run_in_executor(_fetch_pool, fetch_page, url) for url in urls]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def render_pages(urls: list[str], pages: list[Page | Exception]) -> str:
+    # Split the character budget so one long page cannot crowd out the others.
+    share = max(FETCH_MAX_CHARS // max(len(urls), 1), 1000)
+    return "\n\n".join(
+        describe_failure(url, page) if isinstance(page, Exception) else page.render(share)
+        for url, page in zip(urls, pages)
+    )
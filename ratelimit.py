@@ -0,0 +1,227 @@
+import asyncio
+import os
+import random
+import sqlite3
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, TypeVar
+
+from cache import cache, transaction
+
+
+T = TypeVar("T")
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT", "1").strip().lower() not in {"0", "false", "no", "off"}
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+BACKOFF_BASE_SECONDS = float(os.getenv("BACKOFF_BASE_SECONDS", "1"))
+BACKOFF_MAX_SECONDS = float(os.getenv("BACKOFF_MAX_SECONDS", "60"))
+BURST_SECONDS = 10.0
+MIN_RATE_FRACTION = 0.1
+RECOVERY_FRACTION = 0.05
+THROTTLE_FACTOR = 0.5
+TRANSIENT_STATUS_CODES = {408, 409, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    def __init__(self):
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = cache.connect()
+        if not self._ready:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    rate REAL NOT NULL,
+                    blocked_until REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._ready = True
+        return conn
+
+    def _update(self, key: str, base_rate: float, change: Callable[[float, float, float, float], tuple]) -> object:
+        conn = self._connect()
+        now = time.time()
+        with transaction(conn):
+            row = conn.execute(
+                "SELECT tokens, rate, blocked_until, updated_at FROM rate_buckets WHERE key = ?",
+                (key,),
+            ).fetchone()
+            tokens, rate, blocked_until, updated_at = row or (None, base_rate, 0.0, now)
+            rate = min(rate, base_rate)
+            capacity = max(1.0, rate / 60 * BURST_SECONDS)
+            if tokens is None:
+                tokens = capacity
+            tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate / 60)
+            tokens, rate, blocked_until, result = change(now, tokens, rate, blocked_until)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, rate, blocked_until, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (key, tokens, rate, blocked_until, now),
+            )
+        return result
+
+    def reserve(self, key: str, base_rate: float) -> float:
+        def take(now: float, tokens: float, rate: float, blocked_until: float) -> tuple:
+            if now < blocked_until:
+                return tokens, rate, blocked_until, blocked_until - now
+            if tokens >= 1:
+                return tokens - 1, rate, blocked_until, 0.0
+            return tokens, rate, blocked_until, (1 - tokens) * 60 / rate
+
+        try:
+            return self._update(key, base_rate, take)
+        except sqlite3.Error:
+            return 0.0
+
+    def throttled(self, key: str, base_rate: float, delay: float) -> None:
+        def slow_down(now: float, tokens: float, rate: float, blocked_until: float) -> tuple:
+            rate = max(base_rate * MIN_RATE_FRACTION, rate * THROTTLE_FACTOR)
+            return 0.0, rate, max(blocked_until, now + delay), None
+
+        try:
+            self._update(key, base_rate, slow_down)
+        except sqlite3.Error:
+            pass
+
+    def succeeded(self, key: str, base_rate: float) -> None:
+        def recover(now: float, tokens: float, rate: float, blocked_until: float) -> tuple:
+            return tokens, min(base_rate, rate + base_rate * RECOVERY_FRACTION), blocked_until, None
+
+        try:
+            self._update(key, base_rate, recover)
+        except sqlite3.Error:
+            pass
+
+    def acquire(self, key: str, base_rate: float) -> None:
+        while (wait := self.reserve(key, base_rate)) > 0:
+            time.sleep(min(wait, BACKOFF_MAX_SECONDS))
+
+    async def aacquire(self, key: str, base_rate: float) -> None:
+        # reserve() takes a SQLite write lock that other processes may hold for up to its busy timeout.
+        while (wait := await asyncio.to_thread(self.reserve, key, base_rate)) > 0:
+            await asyncio.sleep(min(wait, BACKOFF_MAX_SECONDS))
+
+
+limiter = RateLimiter()
+
+
+def requests_per_minute(provider: str, model_name: str) -> float:
+    if model_name.endswith(":free"):
+        return float(os.getenv("FREE_MODEL_RPM", "16"))
+    env_key = f"{provider.upper().replace(' ', '_')}_RPM"
+    return float(os.getenv(env_key, "40"))
+
+
+def status_code(exc: Exception) -> int | None:
+    code = getattr(exc, "status_code", None)
+    if isinstance(code, int):
+        return code
+    response = getattr(exc, "response", None)
+    code = getattr(response, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    return status_code(exc) == 429 or exc.__class__.__name__ == "RateLimitError"
+
+
+def is_transient_error(exc: Exception) -> bool:
+    if status_code(exc) in TRANSIENT_STATUS_CODES:
+        return True
+    return exc.__class__.__name__ in {"APIConnectionError", "APITimeoutError"}
+
+
+def retry_after_seconds(exc: Exception) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    # OpenRouter reports the window reset as epoch milliseconds.
+    value = headers.get("x-ratelimit-reset")
+    if value:
+        try:
+            reset = float(value)
+            reset = reset / 1000 if reset > 1e11 else reset
+            return max(0.0, reset - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+def backoff_delay(attempt: int) -> float:
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def retry_delay(exc: Exception, attempt: int) -> float:
+    delay = backoff_delay(attempt)
+    retry_after = retry_after_seconds(exc)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, BACKOFF_MAX_SECONDS) + random.uniform(0, BACKOFF_BASE_SECONDS))
+    return delay
+
+
+def call_with_rate_limit(key: str, base_rate: float, call: Callable[[], T]) -> T:
+    if not RATE_LIMIT_ENABLED or base_rate <= 0:
+        return call()
+
+    attempt = 0
+    while True:
+        limiter.acquire(key, base_rate)
+        try:
+            result = call()
+        except Exception as exc:
+            if attempt >= RATE_LIMIT_MAX_RETRIES:
+                raise
+            if is_rate_limit_error(exc):
+                limiter.throttled(key, base_rate, retry_delay(exc, attempt))
+            elif is_transient_error(exc):
+                time.sleep(backoff_delay(attempt))
+            else:
+                raise
+            attempt += 1
+            continue
+        limiter.succeeded(key, base_rate)
+        return result
+
+
+async def acall_with_rate_limit(key: str, base_rate: float, call: Callable[[], Awaitable[T]]) -> T:
+    if not RATE_LIMIT_ENABLED or base_rate <= 0:
+        return await call()
+
+    attempt = 0
+    while True:
+        await limiter.aacquire(key, base_rate)
+        try:
+            result = await call()
+        except Exception as exc:
+            if attempt >= RATE_LIMIT_MAX_RETRIES:
+                raise
+            if is_rate_limit_error(exc):
+                await asyncio.to_thread(limiter.throttled, key, base_rate, retry_delay(exc, attempt))
+            elif is_transient_error(exc):
+                await asyncio.sleep(backoff_delay(attempt))
+            else:
+                raise
+            attempt += 1
+            continue
+        await asyncio.to_thread(limiter.succeeded, key, base_rate)
+        return result
@@ -0,0 +1,259 @@
+import asyncio
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, TypeVar
+
+from hedging import afirst_success, first_success
+from metrics import escape
+
+
+T = TypeVar("T")
+
+BACKEND_HEDGING = os.getenv("BACKEND_HEDGING", "1").strip().lower() not in {"0", "false", "no", "off"}
+HEDGE_PERCENTILE = float(os.getenv("BACKEND_HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.getenv("BACKEND_HEDGE_MIN_DELAY", "0.5"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("BACKEND_HEDGE_DEFAULT_DELAY", "3"))
+LATENCY_WINDOW = int(os.getenv("BACKEND_LATENCY_WINDOW", "200"))
+LATENCY_MIN_SAMPLES = int(os.getenv("BACKEND_LATENCY_MIN_SAMPLES", "20"))
+FAILURE_THRESHOLD = int(os.getenv("BACKEND_FAILURE_THRESHOLD", "5"))
+COOLDOWN = float(os.getenv("BACKEND_COOLDOWN", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class BackendUnavailable(RuntimeError):
+    def __init__(self, backend: str, retry_in: float):
+        super().__init__(f"{backend} is unavailable after repeated failures; retrying in {retry_in:.1f}s.")
+        self.backend = backend
+        self.retry_in = retry_in
+
+
+class LatencyWindow:
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, fraction: float) -> float | None:
+        with self._lock:
+            if len(self._samples) < LATENCY_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return HALF_OPEN
+            return self._state
+
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def acquire(self) -> str | None:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = HALF_OPEN
+            if self._state == CLOSED:
+                return CLOSED
+            # Half-open lets a single probe through; everyone else keeps failing fast until it settles.
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return HALF_OPEN
+            return None
+
+    def success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def release(self) -> None:
+        with self._lock:
+            self._probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class Backend:
+    def __init__(self, name: str):
+        self.name = name
+        self.latency = LatencyWindow()
+        self.breaker = CircuitBreaker()
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def hedge_delay(self) -> float:
+        p95 = self.latency.percentile(HEDGE_PERCENTILE)
+        return max(HEDGE_DEFAULT_DELAY if p95 is None else p95, HEDGE_MIN_DELAY)
+
+    def _admit(self) -> str:
+        admitted = self.breaker.acquire()
+        if admitted is None:
+            self.count("rejected")
+            raise BackendUnavailable(self.name, self.breaker.retry_in())
+        self.count("calls")
+        return admitted
+
+    def _settle(self, error: BaseException | None, winner: int = 0) -> None:
+        if error is None:
+            self.breaker.success()
+            self.count("ok")
+            if winner:
+                self.count("hedge_wins")
+        elif isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+            self.breaker.failure()
+            self.count("timeouts")
+        elif isinstance(error, Exception):
+            self.breaker.failure()
+            self.count("errors")
+        else:
+            # Cancellation says nothing about backend health; free a half-open probe without judging it.
+            self.breaker.release()
+
+    def _timed(self, index: int, call: Callable[[], T]) -> Callable[[], tuple[int, T]]:
+        def attempt() -> tuple[int, T]:
+            if index:
+                self.count("hedged")
+            start = time.perf_counter()
+            result = call()
+            self.latency.add(time.perf_counter() - start)
+            return index, result
+
+        return attempt
+
+    def _atimed(self, index: int, call: Callable[[], Awaitable[T]]) -> Callable[[], Awaitable[tuple[int, T]]]:
+        async def attempt() -> tuple[int, T]:
+            if index:
+                self.count("hedged")
+            start = time.perf_counter()
+            result = await call()
+            self.latency.add(time.perf_counter() - start)
+            return index, result
+
+        return attempt
+
+    # Hedges cover slow requests only; a failed request is not retried, so a dead backend is not hit twice.
+    def call(self, call: Callable[[], T], timeout: float, pool: ThreadPoolExecutor | None = None) -> T:
+        admitted = self._admit()
+        attempts = 2 if BACKEND_HEDGING and admitted == CLOSED else 1
+        try:
+            winner, result = first_success(
+                [self._timed(index, call) for index in range(attempts)],
+                self.hedge_delay(),
+                stop_on=lambda exc: True,
+                timeout=timeout,
+                pool=pool,
+            )
+        except BaseException as exc:
+            self._settle(exc)
+            raise
+        self._settle(None, winner)
+        return result
+
+    async def acall(self, call: Callable[[], Awaitable[T]], timeout: float) -> T:
+        admitted = self._admit()
+        attempts = 2 if BACKEND_HEDGING and admitted == CLOSED else 1
+        try:
+            winner, result = await asyncio.wait_for(
+                afirst_success(
+                    [self._atimed(index, call) for index in range(attempts)],
+                    self.hedge_delay(),
+                    stop_on=lambda exc: True,
+                ),
+                timeout,
+            )
+        except BaseException as exc:
+            self._settle(exc)
+            raise
+        self._settle(None, winner)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(HEDGE_PERCENTILE)
+        state = self.breaker.state
+        return {
+            "state": state,
+            "retry_in": round(self.breaker.retry_in(), 3) if state != CLOSED else 0.0,
+            "samples": len(self.latency),
+            "p50": None if p50 is None else round(p50, 4),
+            "p95": None if p95 is None else round(p95, 4),
+            "hedge_delay": round(self.hedge_delay(), 4) if BACKEND_HEDGING else None,
+            **{name: counts.get(name, 0) for name in ("calls", "ok", "errors", "timeouts", "rejected", "hedged", "hedge_wins")},
+        }
+
+
+_backends: dict[str, Backend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str) -> Backend:
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            backend = _backends[name] = Backend(name)
+        return backend
+
+
+def backend_stats() -> dict[str, dict]:
+    with _backends_lock:
+        backends = dict(_backends)
+    return {name: backend.stats() for name, backend in sorted(backends.items())}
+
+
+def render_backend_metrics() -> str:
+    stats = backend_stats()
+    lines = [
+        "# HELP research_backend_state Circuit breaker state per backend (0 closed, 1 half-open, 2 open).",
+        "# TYPE research_backend_state gauge",
+    ]
+    lines.extend(f'research_backend_state{{backend="{escape(name)}"}} {STATE_VALUES[item["state"]]}' for name, item in stats.items())
+    lines.append("# HELP research_backend_latency_p95_seconds Rolling p95 latency of successful backend attempts.")
+    lines.append("# TYPE research_backend_latency_p95_seconds gauge")
+    for name, item in stats.items():
+        if item["p95"] is not None:
+            lines.append(f'research_backend_latency_p95_seconds{{backend="{escape(name)}"}} {item["p95"]}')
+    lines.append("# HELP research_backend_calls_total Backend calls by outcome, including hedges and fast-failed calls.")
+    lines.append("# TYPE research_backend_calls_total counter")
+    for name, item in stats.items():
+        for outcome in ("ok", "errors", "timeouts", "rejected", "hedged", "hedge_wins"):
+            lines.append(f'research_backend_calls_total{{backend="{escape(name)}",outcome="{outcome}"}} {item[outcome]}')
+    return "\n".join(lines) + "\n"
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import gzip
+import hashlib
 import html
+import json
 import os
 import re
+from dataclasses import dataclass
+from functools import lru_cache
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from urllib.parse import parse_qs
+from urllib.parse import parse_qs, urlsplit
 
 from dotenv import load_dotenv
 
@@ -18,6 +23,11 @@ from core import (
     mask_key,
     perform_research,
 )
+from jobs import Job, JobQueue, JobQueueFull
+from metrics import METRICS_ENABLED, registry
+from ratelimit import is_rate_limit_error, retry_after_seconds
+from resilience import backend_stats, render_backend_metrics
+from store import research_store
 
 
 load_dotenv(override=True)
@@ -25,92 +35,135 @@ load_dotenv(override=True)
 HOST = "127.0.0.1"
 PORT = 8510
 PROVIDERS = [PROVIDER_NVIDIA_NIM, PROVIDER_OPENROUTER]
+JOB_MAX_WAIT = float(os.getenv("JOB_MAX_WAIT", "60"))
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+HTTP_IDLE_TIMEOUT = float(os.getenv("HTTP_IDLE_TIMEOUT", "30"))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "10"))
+JOB_PAGE_PATH = re.compile(r"^/jobs/([0-9a-f]{32})$")
+JOB_API_PATH = re.compile(r"^/api/jobs/([0-9a-f]{32})$")
+HISTORY_API_PATH = re.compile(r"^/api/history/([0-9a-f]{32})$")
+
+jobs = JobQueue()
+
+
+STYLE = """
+:root {
+  color-scheme: light;
+  --ink: #151b22;
+  --muted: #5d6975;
+  --line: #d9e0e7;
+  --panel: #f7f9fb;
+  --accent: #76b900;
+}
+* { box-sizing: border-box; }
+body {
+  margin: 0;
+  font-family: Inter, Segoe UI, Arial, sans-serif;
+  color: var(--ink);
+  background: #ffffff;
+}
+main {
+  width: min(1040px, calc(100vw - 32px));
+  margin: 32px auto 56px;
+}
+h1 { margin: 0 0 6px; font-size: 34px; }
+p { color: var(--muted); line-height: 1.55; }
+label { display: block; font-weight: 650; margin: 18px 0 7px; }
+input, select, textarea {
+  width: 100%;
+  border: 1px solid var(--line);
+  border-radius: 7px;
+  padding: 11px 12px;
+  font: inherit;
+  background: white;
+}
+textarea { min-height: 132px; resize: vertical; }
+.check { font-weight: 500; }
+.check input { width: auto; margin: 0 6px 0 0; }
+button {
+  margin-top: 18px;
+  border: 0;
+  border-radius: 7px;
+  padding: 12px 16px;
+  background: var(--accent);
+  color: #101510;
+  font-weight: 750;
+  cursor: pointer;
+}
+.grid {
+  display: grid;
+  grid-template-columns: repeat(2, minmax(0, 1fr));
+  gap: 16px;
+}
+.panel {
+  border: 1px solid var(--line);
+  border-radius: 8px;
+  padding: 18px;
+  margin-top: 18px;
+  background: var(--panel);
+}
+.result {
+  border-left: 5px solid var(--accent);
+  background: #fbfdf8;
+}
+.error {
+  border-left: 5px solid #c93333;
+  background: #fff8f8;
+  white-space: pre-wrap;
+}
+ul { padding-left: 22px; }
+li { margin: 7px 0; }
+@media (max-width: 720px) {
+  .grid { grid-template-columns: 1fr; }
+  h1 { font-size: 28px; }
+}
+"""
 
 
-def page(title: str, body: str) -> bytes:
+@dataclass(frozen=True)
+class Asset:
+    body: bytes
+    content_type: str
+    cache_control: str
+    etag: str
+    gzipped: bytes | None = None
+
+
+def make_asset(body: bytes, content_type: str, cache_control: str = "no-cache") -> Asset:
+    etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+    gzipped = gzip.compress(body, compresslevel=9) if len(body) >= GZIP_MIN_BYTES else None
+    return Asset(body, content_type, cache_control, etag, gzipped)
+
+
+STYLE_ASSET = make_asset(STYLE.encode("utf-8"), "text/css; charset=utf-8", "public, max-age=31536000, immutable")
+STYLE_URL = f"/static/style.css?v={STYLE_ASSET.etag[1:13]}"
+STATIC_ASSETS = {"/static/style.css": STYLE_ASSET}
+
+
+@lru_cache(maxsize=8)
+def page_head(title: str) -> str:
     return f"""<!doctype html>
 <html lang="en">
 <head>
   <meta charset="utf-8">
   <meta name="viewport" content="width=device-width, initial-scale=1">
   <title>{html.escape(title)}</title>
-  <style>
-    :root {{
-      color-scheme: light;
-      --ink: #151b22;
-      --muted: #5d6975;
-      --line: #d9e0e7;
-      --panel: #f7f9fb;
-      --accent: #76b900;
-    }}
-    * {{ box-sizing: border-box; }}
-    body {{
-      margin: 0;
-      font-family: Inter, Segoe UI, Arial, sans-serif;
-      color: var(--ink);
-      background: #ffffff;
-    }}
-    main {{
-      width: min(1040px, calc(100vw - 32px));
-      margin: 32px auto 56px;
-    }}
-    h1 {{ margin: 0 0 6px; font-size: 34px; }}
-    p {{ color: var(--muted); line-height: 1.55; }}
-    label {{ display: block; font-weight: 650; margin: 18px 0 7px; }}
-    input, select, textarea {{
-      width: 100%;
-      border: 1px solid var(--line);
-      border-radius: 7px;
-      padding: 11px 12px;
-      font: inherit;
-      background: white;
-    }}
-    textarea {{ min-height: 132px; resize: vertical; }}
-    button {{
-      margin-top: 18px;
-      border: 0;
-      border-radius: 7px;
-      padding: 12px 16px;
-      background: var(--accent);
-      color: #101510;
-      font-weight: 750;
-      cursor: pointer;
-    }}
-    .grid {{
-      display: grid;
-      grid-template-columns: repeat(2, minmax(0, 1fr));
-      gap: 16px;
-    }}
-    .panel {{
-      border: 1px solid var(--line);
-      border-radius: 8px;
-      padding: 18px;
-      margin-top: 18px;
-      background: var(--panel);
-    }}
-    .result {{
-      border-left: 5px solid var(--accent);
-      background: #fbfdf8;
-    }}
-    .error {{
-      border-left: 5px solid #c93333;
-      background: #fff8f8;
-      white-space: pre-wrap;
-    }}
-    ul {{ padding-left: 22px; }}
-    li {{ margin: 7px 0; }}
-    @media (max-width: 720px) {{
-      .grid {{ grid-template-columns: 1fr; }}
-      h1 {{ font-size: 28px; }}
-    }}
-  </style>
+  <link rel="stylesheet" href="{STYLE_URL}">
 </head>
 <body>
-  <main>{body}</main>
+  <main>"""
+
+
+PAGE_TAIL = """</main>
 </body>
-</html>""".encode("utf-8")
+</html>"""
 
 
+def page(title: str, body: str) -> bytes:
+    return f"{page_head(title)}{body}{PAGE_TAIL}".encode("utf-8")
+
+
+@lru_cache(maxsize=64)
 def provider_model_options(provider: str, selected_model: str) -> str:
     options = []
     for option in get_provider_options(provider):
@@ -120,21 +173,20 @@ def provider_model_options(provider: str, selected_model: str) -> str:
     return "\n".join(options)
 
 
-def render_form(
-    provider: str = PROVIDER_NVIDIA_NIM,
-    model: str | None = None,
-    query: str = "",
-    result_html: str = "",
-) -> bytes:
-    model = model or get_default_model(provider)
+@lru_cache(maxsize=64)
+def masked_key(api_key: str | None) -> str:
+    return mask_key(api_key) or "not set"
+
+
+@lru_cache(maxsize=64)
+def form_head(provider: str, model: str, current_key: str) -> str:
     provider_options = "\n".join(
         f'<option value="{html.escape(item)}"{" selected" if item == provider else ""}>{html.escape(item)}</option>'
         for item in PROVIDERS
     )
     key_label = PROVIDER_ENV_KEYS[provider]
-    current_key = mask_key(get_api_key(provider)) or "not set"
 
-    body = f"""
+    return f"""
 <h1>AI Research Assistant</h1>
 <p>No-websocket review mode. This page uses plain HTTP, so it avoids the Streamlit browser connection issue.</p>
 
@@ -157,14 +209,46 @@ def render_form(
   <input id="api_key" name="api_key" type="password" placeholder="Optional: paste key for this run">
 
   <label for="query">Research question</label>
-  <textarea id="query" name="query" placeholder="What would you like to research?">{html.escape(query)}</textarea>
+  <textarea id="query" name="query" placeholder="What would you like to research?">"""
+
+
+FORM_TAIL = """</textarea>
+
+  <label class="check"><input type="checkbox" name="refresh" value="1"> Ignore cached results</label>
 
   <button type="submit">Start Research</button>
 </form>
-
-{result_html}
 """
-    return page("AI Research Assistant", body)
+
+
+def form_body(
+    provider: str = PROVIDER_NVIDIA_NIM,
+    model: str | None = None,
+    query: str = "",
+    result_html: str = "",
+) -> str:
+    model = model or get_default_model(provider)
+    head = form_head(provider, model, masked_key(get_api_key(provider)))
+    return f"{head}{html.escape(query)}{FORM_TAIL}\n{result_html}\n"
+
+
+def render_form(
+    provider: str = PROVIDER_NVIDIA_NIM,
+    model: str | None = None,
+    query: str = "",
+    result_html: str = "",
+) -> bytes:
+    return page("AI Research Assistant", form_body(provider, model, query, result_html))
+
+
+@lru_cache(maxsize=16)
+def form_page(provider: str, model: str, current_key: str) -> Asset:
+    return make_asset(render_form(provider, model), "text/html; charset=utf-8")
+
+
+def default_form_page() -> Asset:
+    provider = PROVIDER_NVIDIA_NIM
+    return form_page(provider, get_default_model(provider), masked_key(get_api_key(provider)))
 
 
 def render_result(result) -> str:
@@ -211,42 +295,304 @@ def render_error(message: str) -> str:
     return f'<section class="panel error"><strong>Research failed</strong>\n{html.escape(message)}</section>'
 
 
+def model_catalog(provider: str | None = None) -> dict:
+    providers = [provider] if provider else PROVIDERS
+    return {
+        "providers": [
+            {
+                "provider": item,
+                "default_model": get_default_model(item),
+                "api_key_configured": bool(get_api_key(item)),
+                "models": [
+                    {"model_id": option.model_id, "label": option.label, "supports_tools": option.supports_tools}
+                    for option in get_provider_options(item)
+                ],
+            }
+            for item in providers
+        ]
+    }
+
+
+def accepts_gzip(header: str) -> bool:
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() not in {"gzip", "*"}:
+            continue
+        quality = params.strip().lower()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match is a list, and caches may send the weak form of a tag they stored as strong.
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def read_submission(values: dict) -> tuple[str, str, str | None, str, bool, str]:
+    provider = str(values.get("provider") or PROVIDER_NVIDIA_NIM)
+    if provider not in PROVIDER_ENV_KEYS:
+        return provider, "", None, "", False, f"Unknown provider {provider!r}."
+    model = str(values.get("custom_model") or "").strip() or str(values.get("model") or get_default_model(provider))
+    api_key = str(values.get("api_key") or "").strip() or get_api_key(provider)
+    query = str(values.get("query") or "").strip()
+    refresh = str(values.get("refresh") or "").lower() in {"1", "true", "on"}
+
+    error = ""
+    if not query:
+        error = "Enter a research question first."
+    elif not api_key:
+        error = f"Missing {PROVIDER_ENV_KEYS[provider]}. Paste a key or set it in .env."
+    return provider, model, api_key, query, refresh, error
+
+
 class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = HTTP_IDLE_TIMEOUT
+    # Headers and body are separate writes; with Nagle enabled keep-alive clients stall on delayed ACKs.
+    disable_nagle_algorithm = True
+
     def do_GET(self) -> None:
-        self.respond(render_form())
+        url = urlsplit(self.path)
+        if url.path == "/":
+            self.send_asset(default_form_page())
+        elif url.path in STATIC_ASSETS:
+            self.send_asset(STATIC_ASSETS[url.path])
+        elif url.path == "/metrics" and METRICS_ENABLED:
+            payload = (registry.render() + render_backend_metrics()).encode("utf-8")
+            self.send_payload(payload, "text/plain; version=0.0.4; charset=utf-8")
+        elif url.path == "/api/runs" and METRICS_ENABLED:
+            self.respond_json({"runs": [record.to_dict() for record in registry.recent_runs()]})
+        elif url.path == "/api/backends":
+            self.respond_json({"backends": backend_stats()})
+        elif url.path == "/api/history":
+            params = parse_qs(url.query)
+            try:
+                limit = max(1, min(int(params.get("limit", ["20"])[0]), 200))
+            except ValueError:
+                limit = 20
+            topic = params.get("topic", [""])[0].strip()
+            records = research_store.by_topic(topic, limit) if topic else research_store.recent(limit, params.get("kind", [""])[0] or None)
+            self.respond_json({"records": records})
+        elif match := HISTORY_API_PATH.match(url.path):
+            records = research_store.by_run(match.group(1))
+            if records:
+                self.respond_json({"records": records})
+            else:
+                self.respond_json({"error": "Unknown run."}, 404)
+        elif url.path == "/api/models":
+            provider = parse_qs(url.query).get("provider", [""])[0]
+            if provider and provider not in PROVIDER_ENV_KEYS:
+                self.respond_json({"error": f"Unknown provider {provider!r}."}, 404)
+            else:
+                self.respond_json(model_catalog(provider or None))
+        elif url.path == "/api/jobs":
+            self.respond_json({"jobs": [job.to_dict(include_result=False) for job in jobs.list()]})
+        elif match := JOB_API_PATH.match(url.path):
+            job = jobs.get(match.group(1))
+            if job is None:
+                self.respond_json({"error": "Unknown or expired job."}, 404)
+                return
+            try:
+                wait = min(float(parse_qs(url.query).get("wait", ["0"])[0]), JOB_MAX_WAIT)
+            except ValueError:
+                wait = 0
+            if wait > 0 and not job.finished:
+                job.wait(wait)
+            self.respond_json(job.to_dict())
+        elif match := JOB_PAGE_PATH.match(url.path):
+            job = jobs.get(match.group(1))
+            if job is None:
+                self.respond(render_form(result_html=render_error("Unknown or expired job.")), 404)
+            else:
+                self.stream_job(job)
+        else:
+            self.respond(render_form(result_html=render_error("Page not found.")), 404)
 
     def do_POST(self) -> None:
-        length = int(self.headers.get("Content-Length", "0"))
-        values = parse_qs(self.rfile.read(length).decode("utf-8"))
-        provider = values.get("provider", [PROVIDER_NVIDIA_NIM])[0]
-        model = values.get("custom_model", [""])[0].strip() or values.get("model", [get_default_model(provider)])[0]
-        api_key = values.get("api_key", [""])[0].strip() or get_api_key(provider)
-        query = values.get("query", [""])[0].strip()
-
-        result_html = ""
-        if not query:
-            result_html = render_error("Enter a research question first.")
-        elif not api_key:
-            result_html = render_error(f"Missing {PROVIDER_ENV_KEYS[provider]}. Paste a key or set it in .env.")
+        path = urlsplit(self.path).path
+        if path == "/":
+            self.submit_form()
+        elif path == "/api/jobs":
+            self.submit_api()
+        elif path == "/api/research":
+            self.research_api()
         else:
-            os.environ[PROVIDER_ENV_KEYS[provider]] = api_key
+            self.rfile.read(int(self.headers.get("Content-Length", "0")))
+            self.respond(render_form(result_html=render_error("Page not found.")), 404)
+
+    def read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length", "0"))
+        body = self.rfile.read(length).decode("utf-8")
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            data = json.loads(body or "{}")
+            if not isinstance(data, dict):
+                raise ValueError("Expected a JSON object.")
+            return data
+        return {name: items[0] for name, items in parse_qs(body).items()}
+
+    def start_job(self, provider: str, model: str, api_key: str, query: str, refresh: bool) -> Job:
+        os.environ[PROVIDER_ENV_KEYS[provider]] = api_key
+        return jobs.submit(provider, api_key, model, query, refresh)
+
+    def submit_form(self) -> None:
+        try:
+            values = self.read_body()
+        except ValueError as exc:
+            self.respond(render_form(result_html=render_error(f"Invalid request body: {exc}")), 400)
+            return
+        provider, model, api_key, query, refresh, error = read_submission(values)
+        if provider not in PROVIDER_ENV_KEYS:
+            provider = PROVIDER_NVIDIA_NIM
+        if not error:
             try:
-                result_html = render_result(perform_research(provider, api_key, model, query))
-            except Exception as exc:
-                result_html = render_error(str(exc))
+                job = self.start_job(provider, model, api_key, query, refresh)
+            except JobQueueFull as exc:
+                self.respond(render_form(provider, model, query, render_error(str(exc))), 503)
+                return
+            self.redirect(f"/jobs/{job.id}")
+            return
+        self.respond(render_form(provider=provider, model=model, query=query, result_html=render_error(error)))
+
+    def read_api_submission(self) -> tuple[str, str, str, str, bool] | None:
+        try:
+            values = self.read_body()
+        except ValueError as exc:
+            self.respond_json({"error": f"Invalid JSON body: {exc}"}, 400)
+            return None
+        provider, model, api_key, query, refresh, error = read_submission(values)
+        if error:
+            self.respond_json({"error": error}, 400)
+            return None
+        return provider, model, api_key, query, refresh
+
+    def research_api(self) -> None:
+        submission = self.read_api_submission()
+        if submission is None:
+            return
+        provider, model, api_key, query, refresh = submission
+        os.environ[PROVIDER_ENV_KEYS[provider]] = api_key
+        try:
+            result = perform_research(provider, api_key, model, query, refresh=refresh)
+        except Exception as exc:
+            if is_rate_limit_error(exc):
+                retry_after = retry_after_seconds(exc)
+                headers = {"Retry-After": str(max(1, round(retry_after)))} if retry_after else None
+                self.respond_json({"error": str(exc)}, 429, headers)
+            else:
+                self.respond_json({"error": str(exc) or type(exc).__name__}, 502)
+            return
+        self.respond_json(result.model_dump())
+
+    def submit_api(self) -> None:
+        submission = self.read_api_submission()
+        if submission is None:
+            return
+        provider, model, api_key, query, refresh = submission
+        try:
+            job = self.start_job(provider, model, api_key, query, refresh)
+        except JobQueueFull as exc:
+            self.respond_json({"error": str(exc)}, 503, {"Retry-After": "30"})
+            return
+        self.respond_json(job.to_dict(), 202, {"Location": f"/api/jobs/{job.id}"})
+
+    def stream_job(self, job: Job) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
 
-        self.respond(render_form(provider=provider, model=model, query=query, result_html=result_html))
+        self.write_chunk(page_head("AI Research Assistant") + form_body(provider=job.provider, model=job.model, query=job.query))
+        self.write_chunk('<section class="panel" id="live"><h3>Live output</h3><pre style="white-space:pre-wrap;">')
+        offset = 0
+        finished = False
+        while not finished and not self.close_connection:
+            tokens, finished = job.tokens_since(offset, STREAM_HEARTBEAT_SECONDS)
+            offset += len(tokens)
+            # Tool turns and normalization stream nothing for minutes; an invisible comment keeps proxies
+            # and load balancers from closing the connection as idle. An empty chunk would end the response.
+            if tokens or not finished:
+                self.write_chunk(html.escape("".join(tokens)) if tokens else "<!-- -->")
+        result_html = render_result(job.result) if job.result else render_error(job.error)
+        self.write_chunk(f"</pre></section>{result_html}{PAGE_TAIL}")
+        self.write_chunk_end()
+
+    def write_chunk(self, text: str) -> None:
+        data = text.encode("utf-8")
+        if not data or self.close_connection:
+            return
+        try:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def write_chunk_end(self) -> None:
+        if self.close_connection:
+            return
+        try:
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
 
     def log_message(self, format: str, *args) -> None:
         return
 
-    def respond(self, payload: bytes) -> None:
+    def respond(self, payload: bytes, status: int = 200) -> None:
+        self.send_payload(payload, "text/html; charset=utf-8", status)
+
+    def respond_json(self, data: dict, status: int = 200, headers: dict[str, str] | None = None) -> None:
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_payload(payload, "application/json; charset=utf-8", status, headers)
+
+    def send_payload(self, payload: bytes, content_type: str, status: int = 200, headers: dict[str, str] | None = None) -> None:
+        compress = len(payload) >= GZIP_MIN_BYTES and accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        if compress:
+            payload = gzip.compress(payload, compresslevel=6)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Vary", "Accept-Encoding")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_asset(self, asset: Asset) -> None:
+        compress = asset.gzipped is not None and accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        payload = asset.gzipped if compress else asset.body
+        # Each encoding is a different byte sequence, so each gets its own strong validator.
+        etag = f'{asset.etag[:-1]}-gz"' if compress else asset.etag
+        if etag_matches(self.headers.get("If-None-Match", ""), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", asset.cache_control)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
         self.send_response(200)
-        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Type", asset.content_type)
         self.send_header("Content-Length", str(len(payload)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", asset.cache_control)
+        self.send_header("Vary", "Accept-Encoding")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
         self.end_headers()
         self.wfile.write(payload)
 
+    def redirect(self, location: str) -> None:
+        self.send_response(303)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
 
 if __name__ == "__main__":
     print(f"Review server running at http://{HOST}:{PORT}")
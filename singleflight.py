@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class LeaderCancelled(RuntimeError):
+    def __init__(self):
+        super().__init__("The call this request was waiting on was cancelled.")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self._started = 0
+        self._collapsed = 0
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._collapsed += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._started += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def _settle(self, key: Hashable, future: Future, result: object = None, error: BaseException | None = None) -> None:
+        # Unregister first, so followers woken by a cancelled leader start a fresh flight instead of rejoining this one.
+        self._finish(key, future)
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            # A leader's cancellation or interrupt is its own; followers retry rather than inherit a BaseException.
+            future.set_exception(LeaderCancelled())
+
+    def do(self, key: Hashable, call: Callable[[], T]) -> tuple[T, bool]:
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return future.result(), True
+            except LeaderCancelled:
+                continue
+        try:
+            result = call()
+        except BaseException as exc:
+            self._settle(key, future, error=exc)
+            raise
+        self._settle(key, future, result)
+        return result, False
+
+    async def ado(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                # Followers may be on another thread or event loop than the leader. The shield keeps a
+                # follower's own cancellation (a wait_for timeout, say) from cancelling the shared future.
+                return await asyncio.shield(asyncio.wrap_future(future)), True
+            except LeaderCancelled:
+                continue
+        try:
+            result = await call()
+        except BaseException as exc:
+            self._settle(key, future, error=exc)
+            raise
+        self._settle(key, future, result)
+        return result, False
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"started": self._started, "collapsed": self._collapsed, "in_flight": len(self._calls)}
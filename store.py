@@ -0,0 +1,296 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: a store directory is owned by one process there.
+    fcntl = None
+
+from cache import normalize_query, transaction
+
+
+STORE_ENABLED = os.getenv("RESEARCH_STORE", "1").strip().lower() not in {"0", "false", "no", "off"}
+STORE_DIR = Path(os.getenv("RESEARCH_STORE_DIR", "") or Path(__file__).resolve().parent / "research_outputs" / "store")
+STORE_SEGMENT_BYTES = int(os.getenv("STORE_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+STORE_BATCH_SIZE = int(os.getenv("STORE_BATCH_SIZE", "256"))
+STORE_FSYNC = os.getenv("STORE_FSYNC", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+_run: ContextVar[tuple[str, str] | None] = ContextVar("research_store_run", default=None)
+
+
+@contextmanager
+def research_run(topic: str) -> Iterator[str]:
+    run_id = uuid.uuid4().hex
+    token = _run.set((run_id, topic))
+    try:
+        yield run_id
+    finally:
+        _run.reset(token)
+
+
+def current_run() -> tuple[str, str] | None:
+    return _run.get()
+
+
+class ResearchStore:
+    def __init__(self, directory: Path, segment_bytes: int = STORE_SEGMENT_BYTES, batch_size: int = STORE_BATCH_SIZE):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.batch_size = batch_size
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._local = threading.local()
+        self._start_lock = threading.Lock()
+        self._writer: threading.Thread | None = None
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-compress")
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.directory / "index.sqlite3", timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS records (
+                    id INTEGER PRIMARY KEY,
+                    run_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    topic_key TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    segment INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    compressed INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS records_run ON records (run_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS records_topic ON records (topic_key, id)")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS records_position ON records (segment, offset)")
+            self._local.conn = conn
+        return conn
+
+    def segment_path(self, segment: int, compressed: bool = False) -> Path:
+        return self.directory / f"research-{segment:06d}.jsonl{'.gz' if compressed else ''}"
+
+    def plain_segments(self) -> list[int]:
+        return sorted(int(path.name[9:15]) for path in self.directory.glob("research-*.jsonl"))
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        # Serializes writers across processes (the web app and the review server can share a store).
+        with open(self.directory / ".lock", "a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def append(
+        self,
+        kind: str,
+        data: dict,
+        topic: str | None = None,
+        run_id: str | None = None,
+        wait: bool = False,
+    ) -> str:
+        bound = _run.get()
+        run_id = run_id or (bound[0] if bound else uuid.uuid4().hex)
+        topic = topic if topic is not None else (bound[1] if bound else "")
+        if not STORE_ENABLED:
+            return run_id
+        record = {"run_id": run_id, "kind": kind, "topic": topic, "created_at": time.time(), "data": data}
+        done: Future = Future()
+        self._ensure_writer()
+        self._queue.put((record, done))
+        if wait:
+            done.result()
+        return run_id
+
+    def flush(self, timeout: float | None = None) -> None:
+        if self._writer is None:
+            return
+        done: Future = Future()
+        self._queue.put((None, done))
+        done.result(timeout)
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                with self.locked():
+                    self._recover()
+                self._writer = threading.Thread(target=self._write_loop, name="research-store", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            # Group commit: everything that queued up during the last fsync shares the next one.
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [(record, done) for record, done in batch if record is not None]
+            try:
+                if records:
+                    self._write([record for record, _ in records])
+            except Exception as exc:
+                for _, done in batch:
+                    done.set_exception(exc)
+            else:
+                for _, done in batch:
+                    done.set_result(None)
+
+    def _write(self, records: list[dict]) -> None:
+        conn = self.connect()
+        with self.locked():
+            segments = self.plain_segments()
+            segment = segments[-1] if segments else self._next_segment()
+            rows = []
+            with open(self.segment_path(segment), "ab") as handle:
+                offset = handle.seek(0, os.SEEK_END)
+                for record in records:
+                    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                    handle.write(line)
+                    rows.append(self._row(record, segment, offset, len(line)))
+                    offset += len(line)
+                handle.flush()
+                if STORE_FSYNC:
+                    os.fsync(handle.fileno())
+            with transaction(conn):
+                conn.executemany(
+                    "INSERT OR IGNORE INTO records (run_id, kind, topic_key, created_at, segment, offset, length) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            if offset >= self.segment_bytes:
+                self.segment_path(self._next_segment()).touch()
+                self._compressor.submit(self._compress, segment)
+
+    def _next_segment(self) -> int:
+        existing = [int(path.name[9:15]) for path in self.directory.glob("research-*.jsonl*")]
+        return max(existing, default=0) + 1
+
+    @staticmethod
+    def _row(record: dict, segment: int, offset: int, length: int) -> tuple:
+        return (record["run_id"], record["kind"], normalize_query(record["topic"]), record["created_at"], segment, offset, length)
+
+    def _recover(self) -> None:
+        # A crash between the segment fsync and the index insert leaves unindexed lines at the tail.
+        segments = self.plain_segments()
+        if not segments:
+            return
+        conn = self.connect()
+        for segment in segments:
+            indexed = conn.execute(
+                "SELECT COALESCE(MAX(offset + length), 0) FROM records WHERE segment = ? AND compressed = 0",
+                (segment,),
+            ).fetchone()[0]
+            rows = []
+            with open(self.segment_path(segment), "rb") as handle:
+                handle.seek(indexed)
+                offset = indexed
+                for line in handle:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        rows.append(self._row(json.loads(line), segment, offset, len(line)))
+                    except (ValueError, KeyError):
+                        pass
+                    offset += len(line)
+            if rows:
+                with transaction(conn):
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO records (run_id, kind, topic_key, created_at, segment, offset, length) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+        for segment in segments[:-1]:
+            self._compressor.submit(self._compress, segment)
+
+    def _compress(self, segment: int) -> None:
+        # Each record becomes its own gzip member, so an indexed offset still reads one record with one seek.
+        source = self.segment_path(segment)
+        target = self.segment_path(segment, compressed=True)
+        if not source.exists():
+            return
+        temporary = target.with_suffix(f".gz.{os.getpid()}.tmp")
+        moves = []
+        with open(source, "rb") as reader, open(temporary, "wb") as writer:
+            old_offset = 0
+            for line in reader:
+                member = gzip.compress(line, compresslevel=6, mtime=0)
+                moves.append((writer.tell(), len(member), segment, old_offset))
+                writer.write(member)
+                old_offset += len(line)
+            writer.flush()
+            os.fsync(writer.fileno())
+        os.replace(temporary, target)
+        conn = self.connect()
+        with transaction(conn):
+            conn.executemany(
+                "UPDATE records SET offset = ?, length = ?, compressed = 1 WHERE segment = ? AND offset = ? AND compressed = 0",
+                moves,
+            )
+        source.unlink(missing_ok=True)
+
+    def _read(self, segment: int, offset: int, length: int, compressed: int) -> dict:
+        with open(self.segment_path(segment, bool(compressed)), "rb") as handle:
+            handle.seek(offset)
+            raw = handle.read(length)
+        return json.loads(gzip.decompress(raw) if compressed else raw)
+
+    def _load(self, where: str, params: tuple, limit: int) -> list[dict]:
+        if not STORE_ENABLED or not (self.directory / "index.sqlite3").exists():
+            return []
+        for attempt in range(2):
+            rows = self.connect().execute(
+                f"SELECT segment, offset, length, compressed FROM records {where} ORDER BY id DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+            try:
+                return [self._read(*row) for row in rows]
+            except FileNotFoundError:
+                # The segment was compressed between the index read and the seek; the index now points at the .gz.
+                if attempt:
+                    raise
+        return []
+
+    def by_run(self, run_id: str, limit: int = 100) -> list[dict]:
+        return self._load("WHERE run_id = ?", (run_id,), limit)
+
+    def by_topic(self, topic: str, limit: int = 20) -> list[dict]:
+        return self._load("WHERE topic_key = ?", (normalize_query(topic),), limit)
+
+    def recent(self, limit: int = 20, kind: str | None = None) -> list[dict]:
+        if kind:
+            return self._load("WHERE kind = ?", (kind,), limit)
+        return self._load("", (), limit)
+
+
+research_store = ResearchStore(STORE_DIR)
+
+
+@atexit.register
+def _flush_on_exit() -> None:
+    try:
+        research_store.flush(timeout=10)
+    except Exception:
+        pass
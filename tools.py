@@ -1,64 +1,207 @@
-from langchain_community.tools import DuckDuckGoSearchResults, WikipediaQueryRun
-from langchain_community.utilities import WikipediaAPIWrapper
-from langchain_core.tools import Tool
-from datetime import datetime
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import Awaitable, Callable
+import asyncio
+import os
 import warnings
 
+from cache import get_tool_result, store_tool_result
+from metrics import SpanTimer, span
+from resilience import BackendUnavailable, get_backend
+
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))
+TOOL_TIMEOUTS = {
+    "search": float(os.getenv("SEARCH_TIMEOUT", "20")),
+    "wikipedia": float(os.getenv("WIKI_TIMEOUT", "20")),
+}
+TIMEOUT_ERRORS = (TimeoutError, asyncio.TimeoutError, FutureTimeoutError)
+
+_tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
 # Suppress the Wikipedia BeautifulSoup parser warning
 warnings.filterwarnings("ignore", message="No parser was explicitly specified", category=UserWarning)
 
-def save_to_txt(data: str, filename: str = "research_output.txt"):
-    output_dir = Path(__file__).resolve().parent / "research_outputs"
-    output_dir.mkdir(exist_ok=True)
-    safe_name = Path(filename).name or "research_output.txt"
-    if not safe_name.endswith(".txt"):
-        safe_name = f"{safe_name}.txt"
-    output_path = output_dir / safe_name
+def save_note(data: str) -> str:
+    from store import research_store
+
+    run_id = research_store.append("note", {"text": data}, wait=True)
+    return f"Note saved to the research store under run {run_id}."
+
+
+def call_backend(tool: str, call: Callable[[], str]) -> str:
+    # A timed-out or out-hedged lookup keeps its worker until it returns, but the agent turn moves on.
+    return get_backend(tool).call(call, TOOL_TIMEOUTS[tool], pool=_tool_pool)
+
+
+async def acall_backend(tool: str, call: Callable[[], Awaitable[str]]) -> str:
+    return await get_backend(tool).acall(call, TOOL_TIMEOUTS[tool])
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    formatted_text = f"--- Research Output ---\nTimestamp: {timestamp}\n\n{data}\n\n"
 
-    with open(output_path, "a", encoding="utf-8") as f:
-        f.write(formatted_text)
-    
-    return f"Data successfully saved to {output_path}"
+def tool_failure(tool: str, label: str, query: str, exc: Exception, timing: SpanTimer) -> str:
+    if isinstance(exc, BackendUnavailable):
+        timing.mark("circuit_open")
+        return f"{label} skipped for {query!r}: {exc}"
+    if isinstance(exc, TIMEOUT_ERRORS):
+        timing.mark("timeout")
+        return f"{label} timed out after {TOOL_TIMEOUTS[tool]:g}s for {query!r}."
+    timing.mark("error")
+    return f"{label} failed for {query!r}: {exc}"
 
-save_tool = Tool(
-    name="save_text_to_file",
-    func=save_to_txt,
-    description="Saves structured research data to a text file.",
-)
 
-search = DuckDuckGoSearchResults(output_format="json", num_results=6)
+# Failure strings are returned to the agent but never cached, so a bad minute is not replayed for an hour.
+def cached_lookup(tool: str, label: str, query: str, call: Callable[[], str]) -> str:
+    with span("tool", tool) as timing:
+        cached = get_tool_result(tool, query)
+        if cached is not None:
+            timing.mark("cached")
+            return cached
+        try:
+            result = call_backend(tool, call)
+        except Exception as exc:
+            return tool_failure(tool, label, query, exc, timing)
+        store_tool_result(tool, query, result)
+        return result
+
+
+async def acached_lookup(tool: str, label: str, query: str, call: Callable[[], Awaitable[str]]) -> str:
+    with span("tool", tool) as timing:
+        # The tool cache is SQLite and can wait on another process's write lock; keep that off the event loop.
+        cached = await asyncio.to_thread(get_tool_result, tool, query)
+        if cached is not None:
+            timing.mark("cached")
+            return cached
+        try:
+            result = await acall_backend(tool, call)
+        except Exception as exc:
+            return tool_failure(tool, label, query, exc, timing)
+        await asyncio.to_thread(store_tool_result, tool, query, result)
+        return result
+
+
+@lru_cache(maxsize=1)
+def get_search():
+    from langchain_community.tools import DuckDuckGoSearchResults
+
+    return DuckDuckGoSearchResults(output_format="json", num_results=6)
 
 
 def safe_search(query: str) -> str:
-    try:
-        return search.run(query)
-    except Exception as exc:
-        return f"Web search failed for {query!r}: {exc}"
+    return cached_lookup("search", "Web search", query, lambda: get_search().run(query))
+
 
+async def asafe_search(query: str) -> str:
+    return await acached_lookup("search", "Web search", query, lambda: get_search().arun(query))
 
-search_tool = Tool(
-    name="search",
-    func=safe_search,
-    description="Search the web for current information. Returns JSON results with titles, snippets, and URLs.",
-)
 
-api_wrapper = WikipediaAPIWrapper(top_k_results=2, doc_content_chars_max=1200)
-wiki = WikipediaQueryRun(api_wrapper=api_wrapper)
+@lru_cache(maxsize=1)
+def get_wiki():
+    from langchain_community.tools import WikipediaQueryRun
+    from langchain_community.utilities import WikipediaAPIWrapper
+
+    return WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper(top_k_results=2, doc_content_chars_max=1200))
 
 
 def safe_wikipedia(query: str) -> str:
-    try:
-        return wiki.run(query)
-    except Exception as exc:
-        return f"Wikipedia lookup failed for {query!r}: {exc}"
+    return cached_lookup("wikipedia", "Wikipedia lookup", query, lambda: get_wiki().run(query))
+
+
+async def asafe_wikipedia(query: str) -> str:
+    return await acached_lookup("wikipedia", "Wikipedia lookup", query, lambda: get_wiki().arun(query))
+
+
+def safe_research_memory(query: str) -> str:
+    from memory import recall
+
+    with span("tool", "research_memory") as timing:
+        result = recall(query)
+        if result.startswith("No earlier research"):
+            timing.mark("miss")
+        return result
+
+
+def fetch_status(pages: list) -> str:
+    statuses = {"error" if isinstance(page, Exception) else page.status for page in pages}
+    if statuses == {"error"}:
+        return "error"
+    if statuses <= {"cached", "revalidated"}:
+        return "cached"
+    return "ok"
+
+
+def safe_fetch_page(urls: str) -> str:
+    from pagefetch import fetch_pages, parse_urls, render_pages
+
+    with span("tool", "fetch_page") as timing:
+        targets = parse_urls(urls)
+        if not targets:
+            timing.mark("error")
+            return f"No http or https URL found in {urls!r}."
+        pages = fetch_pages(targets)
+        timing.set(urls=len(targets))
+        timing.mark(fetch_status(pages))
+        return render_pages(targets, pages)
+
+
+async def asafe_fetch_page(urls: str) -> str:
+    from pagefetch import afetch_pages, parse_urls, render_pages
+
+    with span("tool", "fetch_page") as timing:
+        targets = parse_urls(urls)
+        if not targets:
+            timing.mark("error")
+            return f"No http or https URL found in {urls!r}."
+        pages = await afetch_pages(targets)
+        timing.set(urls=len(targets))
+        timing.mark(fetch_status(pages))
+        return render_pages(targets, pages)
+
+
+@lru_cache(maxsize=1)
+def get_tools() -> dict:
+    from langchain_core.tools import Tool
+
+    from pagefetch import FETCH_MAX_URLS
+
+    return {
+        "save_tool": Tool(
+            name="save_note",
+            func=save_note,
+            description="Save intermediate research notes to the local research store, filed under the current question.",
+        ),
+        "search_tool": Tool(
+            name="search",
+            func=safe_search,
+            coroutine=asafe_search,
+            description="Search the web for current information. Returns JSON results with titles, snippets, and URLs.",
+        ),
+        "wiki_tool": Tool(
+            name="wikipedia",
+            func=safe_wikipedia,
+            coroutine=asafe_wikipedia,
+            description="Look up encyclopedia context from Wikipedia. Returns a failure note instead of raising when Wikipedia is unavailable.",
+        ),
+        "memory_tool": Tool(
+            name="research_memory",
+            func=safe_research_memory,
+            description="Search reports this assistant has already written, by keywords or the question itself. Returns earlier summaries, findings, and source links in milliseconds without going online.",
+        ),
+        "fetch_tool": Tool(
+            name="fetch_page",
+            func=safe_fetch_page,
+            coroutine=asafe_fetch_page,
+            description=f"Read the main text of web pages. Pass one URL, or up to {FETCH_MAX_URLS} URLs separated by spaces to fetch them together. Use it on promising search results instead of searching again.",
+        ),
+    }
 
 
-wiki_tool = Tool(
-    name="wikipedia",
-    func=safe_wikipedia,
-    description="Look up encyclopedia context from Wikipedia. Returns a failure note instead of raising when Wikipedia is unavailable.",
-)
+def __getattr__(name: str):
+    # Tools and their clients are built on first use so importing this module stays cheap.
+    if name in {"save_tool", "search_tool", "wiki_tool", "fetch_tool", "memory_tool"}:
+        return get_tools()[name]
+    if name == "search":
+        return get_search()
+    if name == "wiki":
+        return get_wiki()
+    if name == "api_wrapper":
+        return get_wiki().api_wrapper
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,122 @@
+import json
+import os
+from functools import lru_cache
+from typing import Sequence
+
+
+TRANSCRIPT_MAX_TOKENS = int(os.getenv("TRANSCRIPT_MAX_TOKENS", "4000"))
+FALLBACK_TRANSCRIPT_TOKENS = int(os.getenv("FALLBACK_TRANSCRIPT_TOKENS", "1500"))
+TRANSCRIPT_ENCODING = os.getenv("TRANSCRIPT_ENCODING", "cl100k_base")
+SEPARATOR = "\n\n"
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TRANSCRIPT_ENCODING)
+    except Exception:
+        # tiktoken downloads its tables on first use; offline, fall back to four characters per token.
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def tail_tokens(text: str, tokens: int) -> str:
+    encoding = get_encoding()
+    if encoding is None:
+        return text[-tokens * 4 :]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[-tokens:])
+
+
+def render_message(message: object) -> list[tuple[str, bool]]:
+    role = getattr(message, "type", message.__class__.__name__)
+    name = getattr(message, "name", None)
+    content = getattr(message, "content", "")
+    tool_calls = getattr(message, "tool_calls", None)
+
+    if isinstance(content, list):
+        content = json.dumps(content, ensure_ascii=False)
+    elif content is None:
+        content = ""
+
+    prefix = f"{role}:{name}" if name else role
+    lines = [(f"{prefix}: {content}", False)] if content or not tool_calls else []
+    if tool_calls:
+        lines.append((f"{role}:tool_calls: {json.dumps(tool_calls, ensure_ascii=False)}", True))
+    return lines
+
+
+class Transcript:
+    def __init__(self, messages: Sequence[object] = ()):
+        self._entries: list[tuple[str, int, bool]] = []
+        self._seen = 0
+        self._last_id: int | None = None
+        self._renders: dict[int, str] = {}
+        self.extend(messages)
+
+    def extend(self, messages: Sequence[object]) -> "Transcript":
+        # Agent state only ever grows, so each step renders and counts just the new messages.
+        if self._seen and (len(messages) < self._seen or id(messages[self._seen - 1]) != self._last_id):
+            self._entries.clear()
+            self._seen = 0
+        for message in messages[self._seen :]:
+            pinned_query = not self._entries and getattr(message, "type", "") == "human"
+            for text, pinned in render_message(message):
+                self._entries.append((text, count_tokens(text), pinned or pinned_query))
+        if len(messages) != self._seen:
+            self._seen = len(messages)
+            self._last_id = id(messages[-1])
+            self._renders.clear()
+        return self
+
+    def render(self, max_tokens: int = TRANSCRIPT_MAX_TOKENS) -> str:
+        cached = self._renders.get(max_tokens)
+        if cached is not None:
+            return cached
+
+        separator = count_tokens(SEPARATOR)
+        pinned = {index for index, (_, _, pin) in enumerate(self._entries) if pin}
+        pinned_tokens = sum(self._entries[index][1] + separator for index in pinned)
+        # Pinned query and tool-call headers may use half the budget; the oldest headers give way first.
+        for index in sorted(pinned)[1:]:
+            if pinned_tokens <= max_tokens // 2:
+                break
+            pinned.discard(index)
+            pinned_tokens -= self._entries[index][1] + separator
+
+        # Every pinned entry can open a gap, and each gap costs an "omitted" marker.
+        marker = count_tokens("[9999 earlier entries omitted]") + separator
+        remaining = max_tokens - pinned_tokens - marker * (len(pinned) + 1)
+        kept: dict[int, str] = {index: self._entries[index][0] for index in pinned}
+        for index in range(len(self._entries) - 1, -1, -1):
+            if index in pinned:
+                continue
+            text, tokens, _ = self._entries[index]
+            if tokens + separator <= remaining:
+                kept[index] = text
+                remaining -= tokens + separator
+                continue
+            if remaining > 32:
+                kept[index] = tail_tokens(text, remaining - separator)
+            break
+
+        parts = []
+        previous = -1
+        for index in sorted(kept):
+            if index > previous + 1 and parts:
+                parts.append(f"[{index - previous - 1} earlier entries omitted]")
+            parts.append(kept[index])
+            previous = index
+        rendered = SEPARATOR.join(parts)
+        self._renders[max_tokens] = rendered
+        return rendered
+
+    def __str__(self) -> str:
+        return self.render()